@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pygame
+
+# images, fonts and sounds for the pygame front end, loaded the first time they are asked for and kept from then on
+# images are cached per (path, size) after scaling and conversion to the display's pixel format, so a blit never has
+# to convert or scale again. decoding a file is the slow part of loading an image, it can be done ahead of time on a
+# background thread while the menu is already on screen
+
+
+class AssetManager:
+    """
+    Lazy cache of the game's assets. Every load is timed, report() shows where the time went.
+    """
+
+    def __init__(self):
+        self.images = {}  # (path, size, alpha) -> scaled and converted surface
+        self.decoded = {}  # path -> surface as loaded from the file, shared with the preload thread
+        self.fonts = {}  # (path, size) -> font
+        self.sounds = {}  # path -> sound
+        self.lock = threading.Lock()
+        self.preloadThread = None
+        self.timings = []  # (what was done, seconds, "main" or "preload")
+
+    def decode(self, path, where="main"):
+        """
+        Surface as loaded from an image file, decoded once.
+        """
+        with self.lock:
+            surface = self.decoded.get(path)
+        if surface is None:
+            start = time.perf_counter()
+            surface = pygame.image.load(path)
+            self.timings.append(("load " + path, time.perf_counter() - start, where))
+            with self.lock:
+                surface = self.decoded.setdefault(path, surface)
+        return surface
+
+    def image(self, path, size=None, alpha=False):
+        """
+        Image scaled to size, (width, height), and converted to the pixel format of the display, with per-pixel
+        transparency kept when alpha is set. Before the display exists the surface is cached unconverted.
+        """
+        key = (path, size, alpha)
+        surface = self.images.get(key)
+        if surface is None:
+            surface = self.decode(path)
+            start = time.perf_counter()
+            if size is not None and surface.get_size() != size:
+                surface = pygame.transform.scale(surface, size)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha() if alpha else surface.convert()
+            self.timings.append(("prepare %s %s" % (path, "x".join(map(str, size)) if size else "unscaled"),
+                                 time.perf_counter() - start, "main"))
+            self.images[key] = surface
+        return surface
+
+    def font(self, path, size):
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            start = time.perf_counter()
+            font = self.fonts[key] = pygame.font.Font(path, size)
+            self.timings.append(("font %s %d" % (path, size), time.perf_counter() - start, "main"))
+        return font
+
+    def sound(self, path):
+        sound = self.sounds.get(path)
+        if sound is None:
+            start = time.perf_counter()
+            sound = self.sounds[path] = pygame.mixer.Sound(path)
+            self.timings.append(("sound " + path, time.perf_counter() - start, "main"))
+        return sound
+
+    def preload(self, paths):
+        """
+        Decode image files on a background thread, so their first use only has to scale and convert them.
+        """
+        def run():
+            for path in paths:
+                try:
+                    self.decode(path, "preload")
+                except (pygame.error, OSError):
+                    pass  # raised again where the image is used, on the main thread
+
+        self.preloadThread = threading.Thread(target=run, name="asset preload", daemon=True)
+        self.preloadThread.start()
+
+    def report(self):
+        """
+        The timed loads, slowest first, with the totals for the main thread and the preload thread.
+        """
+        lines = ["%8.1f ms  %-7s %s" % (seconds * 1000, where, what)
+                 for what, seconds, where in sorted(self.timings, key=lambda timing: -timing[1])]
+        for where in ("main", "preload"):
+            total = sum(seconds for what, seconds, timing_where in self.timings if timing_where == where)
+            lines.append("%8.1f ms  %s thread total" % (total * 1000, where))
+        return "\n".join(lines)
@@ -0,0 +1,230 @@
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+
+from ChessGame import GameState, MOVE_KIND, MOVE_PROMOTION, Move
+
+# endgame bitbases: for every position of a king and one piece against a lone king, whether the side with the piece
+# wins with best play. the lone king can never win, so one bit per position is enough for win, draw and loss
+# a table is indexed by ((side * 64 + strong king) * 64 + weak king) * 64 + piece square, with side 0 when the side
+# with the piece is to move and squares numbered row * 8 + col like the packed moves. positions are stored from
+# white's point of view, black having the piece is looked up with the board mirrored top to bottom
+# bit i of a table is bit i % 8 of byte i // 8, impossible positions are stored as 0
+# the tables are generated by retrograde analysis with GameState's own move generation, KPK last because
+# promotions lead into the KQK and KRK tables
+
+tableNames = ("KQK", "KRK", "KPK")  # in the order they have to be generated
+TABLE_POSITIONS = 2 * 64 * 64 * 64
+WEAK_TO_MOVE = 64 * 64 * 64  # offset of the positions with the lone king to move
+
+
+def tableIndex(side, strongKing, weakKing, pieceSquare):
+    return ((side * 64 + strongKing) * 64 + weakKing) * 64 + pieceSquare
+
+
+def kingsTouch(square, other):
+    return abs(square // 8 - other // 8) <= 1 and abs(square % 8 - other % 8) <= 1
+
+
+def generateTable(name, tables):
+    """
+    Bits of the table for name ("KQK", "KRK" or "KPK") as a bytearray. tables holds the tables generated so far,
+    promotions are looked up in them.
+    Every legal position is set up once to collect its moves, then wins are propagated backwards from the
+    checkmates: a position with the strong side to move is won when one move leads to a win, one with the lone king
+    to move when every move does.
+    """
+    piece = name[1] if name[1] != "P" else "p"
+    win = bytearray(TABLE_POSITIONS)
+    remaining = array("i", [0]) * TABLE_POSITIONS  # lone king to move: moves not yet known to lose, -1 if one draws
+    in_check = bytearray(WEAK_TO_MOVE)  # lone king in check, those positions are impossible with the other side to move
+    edges_from = array("I")
+    edges_to = array("I")
+    found = []  # positions known to be won, whose predecessors still have to be looked at
+    gameState = GameState()  # every position is seen once, so no move cache
+    empty_board = [["--"] * 8 for row in range(8)]
+
+    for side in (1, 0):
+        for strong_king in range(64):
+            for weak_king in range(64):
+                if kingsTouch(strong_king, weak_king):
+                    continue
+                for piece_square in range(64):
+                    if piece_square == strong_king or piece_square == weak_king or \
+                            (piece == "p" and not 8 <= piece_square < 56):
+                        continue
+                    placement = (strong_king * 64 + weak_king) * 64 + piece_square
+                    if side == 0 and in_check[placement]:
+                        continue
+                    index = side * WEAK_TO_MOVE + placement
+                    board = [list(row) for row in empty_board]
+                    board[strong_king // 8][strong_king % 8] = "wK"
+                    board[weak_king // 8][weak_king % 8] = "bK"
+                    board[piece_square // 8][piece_square % 8] = "w" + piece
+                    gameState.setPosition(board, side == 0)
+                    moves = gameState.getValidMoves()
+                    if side == 1:
+                        in_check[placement] = gameState.inCheck
+                    if gameState.checkmate:
+                        win[index] = 1
+                        found.append(index)
+                        continue
+                    escapes = False  # a move that draws straight away
+                    for move in moves:
+                        start, end = move & 63, move >> 6 & 63
+                        if side == 1:
+                            if end == piece_square:
+                                escapes = True  # takes the piece
+                                continue
+                            successor = tableIndex(0, strong_king, end, piece_square)
+                        elif move & MOVE_KIND == MOVE_PROMOTION:
+                            table = tables.get("K" + Move.promotion_pieces[move >> 14 & 3] + "K")
+                            promoted = tableIndex(1, strong_king, weak_king, end)
+                            if table is not None and table[promoted >> 3] >> (promoted & 7) & 1 and not win[index]:
+                                win[index] = 1
+                                found.append(index)
+                            continue
+                        elif start == strong_king:
+                            successor = tableIndex(1, end, weak_king, piece_square)
+                        else:
+                            successor = tableIndex(1, strong_king, weak_king, end)
+                        edges_from.append(index)
+                        edges_to.append(successor)
+                        if side == 1:
+                            remaining[index] += 1
+                    if escapes:
+                        remaining[index] = -1
+
+    # predecessors of every position, grouped by position
+    starts = array("I", [0]) * (TABLE_POSITIONS + 1)
+    for successor in edges_to:
+        starts[successor + 1] += 1
+    for index in range(TABLE_POSITIONS):
+        starts[index + 1] += starts[index]
+    fill = array("I", starts)
+    predecessors = array("I", [0]) * len(edges_to)
+    for i in range(len(edges_to)):
+        successor = edges_to[i]
+        predecessors[fill[successor]] = edges_from[i]
+        fill[successor] += 1
+    del edges_from, edges_to, fill
+
+    while found:
+        index = found.pop()
+        for i in range(starts[index], starts[index + 1]):
+            predecessor = predecessors[i]
+            if win[predecessor]:
+                continue
+            if predecessor < WEAK_TO_MOVE:
+                win[predecessor] = 1
+                found.append(predecessor)
+            elif remaining[predecessor] > 0:
+                remaining[predecessor] -= 1
+                if remaining[predecessor] == 0:
+                    win[predecessor] = 1
+                    found.append(predecessor)
+
+    bits = bytearray(TABLE_POSITIONS // 8)
+    for index in range(TABLE_POSITIONS):
+        if win[index]:
+            bits[index >> 3] |= 1 << (index & 7)
+    return bits
+
+
+def generateBitbases(directory, out=None):
+    """
+    Generate every table into directory as NAME.bb files, writing progress to out if given.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    for name in tableNames:
+        start = time.perf_counter()
+        tables[name] = generateTable(name, tables)
+        with open(os.path.join(directory, name + ".bb"), "wb") as table_file:
+            table_file.write(tables[name])
+        if out is not None:
+            wins = sum(bin(byte).count("1") for byte in tables[name])
+            out.write("%s: %d won positions, %.1fs\n" % (name, wins, time.perf_counter() - start))
+
+
+class Bitbases:
+    """
+    Probes the tables found in a directory. The files are memory-mapped, so a probe is a single bit lookup
+    and opening them reads nothing.
+    """
+
+    def __init__(self, directory):
+        self.tables = {}
+        self.files = []
+        for name in tableNames:
+            path = os.path.join(directory, name + ".bb")
+            if os.path.exists(path):
+                table_file = open(path, "rb")
+                if os.fstat(table_file.fileno()).st_size != TABLE_POSITIONS // 8:
+                    table_file.close()
+                    raise ValueError("%s is not a %s table" % (path, name))
+                self.files.append(table_file)
+                self.tables[name] = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def probe(self, gameState):
+        """
+        1 if the side to move wins, 0 for a draw and -1 for a loss, None if the position has no table.
+        """
+        white = gameState.pieceSquares["w"]
+        black = gameState.pieceSquares["b"]
+        if len(white) + len(black) != 3:
+            return None
+        strong = "w" if len(white) == 2 else "b"
+        for row, col in white if strong == "w" else black:
+            piece = gameState.board[row][col][1]
+            if piece != "K":
+                piece_square = row * 8 + col
+                break
+        table = self.tables.get("K" + piece.upper() + "K")
+        if table is None:
+            return None
+        if strong == "w":
+            strong_king = gameState.whiteKingLocation
+            weak_king = gameState.black_king_location
+            flip = 0
+        else:
+            strong_king = gameState.black_king_location
+            weak_king = gameState.whiteKingLocation
+            flip = 56  # mirror the rows so the piece belongs to white
+        side = 0 if gameState.whiteToMove == (strong == "w") else 1
+        index = tableIndex(side, (strong_king[0] * 8 + strong_king[1]) ^ flip, (weak_king[0] * 8 + weak_king[1]) ^ flip,
+                           piece_square ^ flip)
+        if not table[index >> 3] >> (index & 7) & 1:
+            return 0
+        return 1 if side == 0 else -1
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        for table_file in self.files:
+            table_file.close()
+        self.tables = {}
+        self.files = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the KQK, KRK and KPK bitbases or look up a position.")
+    parser.add_argument("--dir", default="bitbases", help="directory of the table files")
+    parser.add_argument("--generate", action="store_true", help="generate the tables")
+    parser.add_argument("--fen", help="position to look up")
+    args = parser.parse_args()
+
+    if args.generate:
+        generateBitbases(args.dir, sys.stdout)
+    if args.fen:
+        bitbases = Bitbases(args.dir)
+        result = bitbases.probe(GameState.fromFen(args.fen))
+        print({None: "no table", 1: "win", 0: "draw", -1: "loss"}[result])
+        bitbases.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+from ChessGame import CastleRights, MOVE_CASTLE, MOVE_ENPASSANT, MOVE_KIND, MOVE_PROMOTION, Move, pieceCodes, \
+    pieceNames
+
+# alternative position core for GameState, built on 64-bit integer bitboards
+# square index is row * 8 + col, so square 0 is a8 and square 63 is h1 (the same orientation as GameState.board)
+# bit n of a bitboard is set when square n is occupied by that piece
+# pieces use the same codes as packed moves, a piece's code is its colour offset plus its type
+
+WHITE, BLACK = 1, 7  # offsets of each colour in pieceNames
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+# castling rights packed into 4 bits
+WKS, WQS, BKS, BQS = 1, 2, 4, 8
+
+# directions 0-3 are orthogonal, 4-7 are diagonal, same order as GameState.checkForPinsAndChecks
+directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def onBoard(row, col):
+    return 0 <= row <= 7 and 0 <= col <= 7
+
+
+def buildStepTable(steps):
+    """
+    Bitboard of the squares reachable from every square with a single step.
+    """
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        bits = 0
+        for d_row, d_col in steps:
+            if onBoard(row + d_row, col + d_col):
+                bits |= 1 << ((row + d_row) * 8 + col + d_col)
+        table.append(bits)
+    return table
+
+
+knightAttacks = buildStepTable(((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2)))
+kingAttacks = buildStepTable(directions)
+# pawnAttacks[colour][sq] are the squares a pawn of that colour standing on sq attacks
+pawnAttacks = {WHITE: buildStepTable(((-1, -1), (-1, 1))), BLACK: buildStepTable(((1, -1), (1, 1)))}
+
+# rays[d][sq] holds every square in direction d from sq, not including sq itself
+rays = [[0] * 64 for _ in directions]
+# betweenSquares[a][b] holds the squares strictly between a and b when they share a line, otherwise 0
+betweenSquares = [[0] * 64 for _ in range(64)]
+for d, (d_row, d_col) in enumerate(directions):
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        between = 0
+        for i in range(1, 8):
+            end_row, end_col = row + d_row * i, col + d_col * i
+            if not onBoard(end_row, end_col):
+                break
+            end_sq = end_row * 8 + end_col
+            rays[d][sq] |= 1 << end_sq
+            betweenSquares[sq][end_sq] = between
+            between |= 1 << end_sq
+# a ray pointing towards higher square numbers meets its first blocker at the lowest set bit, otherwise at the highest
+rayIsPositive = [d_row > 0 or (d_row == 0 and d_col > 0) for d_row, d_col in directions]
+
+# castling rights that survive a move touching each square
+castleMask = [WKS | WQS | BKS | BQS] * 64
+castleMask[0] &= ~BQS
+castleMask[4] &= ~(BKS | BQS)
+castleMask[7] &= ~BKS
+castleMask[56] &= ~WQS
+castleMask[60] &= ~(WKS | WQS)
+castleMask[63] &= ~WKS
+
+rank8 = 0xFF  # squares 0-7, white promotes here
+rank1 = 0xFF << 56  # squares 56-63, black promotes here
+rank3 = 0xFF << 40  # white pawns land here after a single push from their start row
+rank6 = 0xFF << 16  # black pawns land here after a single push from their start row
+fileA = sum(1 << (row * 8) for row in range(8))
+fileH = fileA << 7
+
+
+def rayAttacks(d, sq, occupied):
+    """
+    Squares attacked from sq in direction d, stopping at (and including) the first blocker.
+    """
+    ray = rays[d][sq]
+    blockers = ray & occupied
+    if blockers:
+        if rayIsPositive[d]:
+            blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            blocker = blockers.bit_length() - 1
+        ray ^= rays[d][blocker]
+    return ray
+
+
+def rookAttacks(sq, occupied):
+    return rayAttacks(0, sq, occupied) | rayAttacks(1, sq, occupied) | rayAttacks(2, sq, occupied) | \
+        rayAttacks(3, sq, occupied)
+
+
+def bishopAttacks(sq, occupied):
+    return rayAttacks(4, sq, occupied) | rayAttacks(5, sq, occupied) | rayAttacks(6, sq, occupied) | \
+        rayAttacks(7, sq, occupied)
+
+
+def squares(bits):
+    """
+    Yield the index of every set bit, lowest first.
+    """
+    while bits:
+        bit = bits & -bits
+        yield bit.bit_length() - 1
+        bits ^= bit
+
+
+class BitboardGameState:
+    """
+    Drop-in alternative to GameState: getValidMoves, makeMove and undoMove behave the same and use the same
+    packed moves, but the position is kept as one bitboard per piece type and colour.
+    A list of piece codes per square gives the captured piece of a move without searching the bitboards.
+    """
+
+    def __init__(self, board=None, whiteToMove=True, castlingRights=None, enpassantPossible=()):
+        if board is None:
+            board = [
+                ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+                ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
+                ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
+        if castlingRights is None:
+            castlingRights = CastleRights(True, True, True, True)
+        self.mailbox = [pieceCodes[board[row][col]] for row in range(8) for col in range(8)]
+        self.pieces = [0] * len(pieceNames)  # one bitboard per piece code, the entry for empty squares stays 0
+        for sq in range(64):
+            if self.mailbox[sq]:
+                self.pieces[self.mailbox[sq]] |= 1 << sq
+        self.whiteToMove = whiteToMove
+        self.moveLog = []
+        self.checkmate = False
+        self.stalemate = False
+        self.inCheck = False
+        self.enpassantPossible = enpassantPossible
+        self.enpassantPossibleLog = [self.enpassantPossible]
+        self.castlingBits = (WKS if castlingRights.wks else 0) | (WQS if castlingRights.wqs else 0) | \
+                            (BKS if castlingRights.bks else 0) | (BQS if castlingRights.bqs else 0)
+        self.castlingBitsLog = [self.castlingBits]
+
+    @classmethod
+    def fromGameState(cls, gameState):
+        """
+        Build a bitboard position from the current position of a GameState.
+        """
+        rights = gameState.currentCastlingRights
+        return cls(gameState.board, gameState.whiteToMove, CastleRights(rights.wks, rights.bks, rights.wqs, rights.bqs),
+                   gameState.enpassantPossible)
+
+    @property
+    def board(self):
+        """
+        The position as GameState's 8x8 grid of piece names, for drawPieces and Move.
+        """
+        return [[pieceNames[code] for code in self.mailbox[row * 8:row * 8 + 8]] for row in range(8)]
+
+    @property
+    def whiteKingLocation(self):
+        return divmod(self.pieces[WHITE + KING].bit_length() - 1, 8)
+
+    @property
+    def black_king_location(self):
+        return divmod(self.pieces[BLACK + KING].bit_length() - 1, 8)
+
+    @property
+    def currentCastlingRights(self):
+        bits = self.castlingBits
+        return CastleRights(bool(bits & WKS), bool(bits & BKS), bool(bits & WQS), bool(bits & BQS))
+
+    def occupancy(self, colour):
+        pieces = self.pieces
+        return pieces[colour] | pieces[colour + 1] | pieces[colour + 2] | pieces[colour + 3] | pieces[colour + 4] | \
+            pieces[colour + 5]
+
+    def makeMove(self, move):
+        pieces = self.pieces
+        mailbox = self.mailbox
+        start_sq = move & 63
+        end_sq = move >> 6 & 63
+        kind = move & MOVE_KIND
+        moved = move >> 16 & 15
+        captured = move >> 20 & 15
+        pieces[moved] ^= (1 << start_sq) | (1 << end_sq)
+        mailbox[start_sq] = 0
+        mailbox[end_sq] = moved
+
+        if kind == MOVE_ENPASSANT:
+            # the captured pawn stands beside the moving pawn, not on the landing square
+            captured_sq = (start_sq & ~7) | (end_sq & 7)
+            pieces[captured] ^= 1 << captured_sq
+            mailbox[captured_sq] = 0
+        elif captured:
+            pieces[captured] ^= 1 << end_sq
+
+        if kind == MOVE_PROMOTION:
+            promoted = pieceCodes[pieceNames[moved][0] + Move.promotion_pieces[move >> 14 & 3]]
+            pieces[moved] ^= 1 << end_sq
+            pieces[promoted] ^= 1 << end_sq
+            mailbox[end_sq] = promoted
+
+        if kind == MOVE_CASTLE:
+            rook = moved + ROOK - KING
+            if end_sq - start_sq == 2:  # kingside
+                rook_start, rook_end = end_sq + 1, end_sq - 1
+            else:  # queenside
+                rook_start, rook_end = end_sq - 2, end_sq + 1
+            pieces[rook] ^= (1 << rook_start) | (1 << rook_end)
+            mailbox[rook_end] = rook
+            mailbox[rook_start] = 0
+
+        if (moved == WHITE + PAWN or moved == BLACK + PAWN) and abs(start_sq - end_sq) == 16:
+            self.enpassantPossible = divmod((start_sq + end_sq) // 2, 8)
+        else:
+            self.enpassantPossible = ()
+        self.enpassantPossibleLog.append(self.enpassantPossible)
+
+        self.castlingBits &= castleMask[start_sq] & castleMask[end_sq]
+        self.castlingBitsLog.append(self.castlingBits)
+
+        self.moveLog.append(move)
+        self.whiteToMove = not self.whiteToMove
+
+    def undoMove(self):
+        if len(self.moveLog) != 0:
+            move = self.moveLog.pop()
+            pieces = self.pieces
+            mailbox = self.mailbox
+            start_sq = move & 63
+            end_sq = move >> 6 & 63
+            kind = move & MOVE_KIND
+            moved = move >> 16 & 15
+            captured = move >> 20 & 15
+            if kind == MOVE_PROMOTION:
+                pieces[mailbox[end_sq]] ^= 1 << end_sq
+                pieces[moved] ^= 1 << end_sq
+            pieces[moved] ^= (1 << start_sq) | (1 << end_sq)
+            mailbox[start_sq] = moved
+
+            if kind == MOVE_ENPASSANT:
+                captured_sq = (start_sq & ~7) | (end_sq & 7)
+                pieces[captured] ^= 1 << captured_sq
+                mailbox[end_sq] = 0
+                mailbox[captured_sq] = captured
+            else:
+                mailbox[end_sq] = captured
+                if captured:
+                    pieces[captured] ^= 1 << end_sq
+
+            if kind == MOVE_CASTLE:
+                rook = moved + ROOK - KING
+                if end_sq - start_sq == 2:  # kingside
+                    rook_start, rook_end = end_sq + 1, end_sq - 1
+                else:  # queenside
+                    rook_start, rook_end = end_sq - 2, end_sq + 1
+                pieces[rook] ^= (1 << rook_start) | (1 << rook_end)
+                mailbox[rook_start] = rook
+                mailbox[rook_end] = 0
+
+            self.enpassantPossibleLog.pop()
+            self.enpassantPossible = self.enpassantPossibleLog[-1]
+            self.castlingBitsLog.pop()
+            self.castlingBits = self.castlingBitsLog[-1]
+            self.whiteToMove = not self.whiteToMove
+            self.checkmate = False
+            self.stalemate = False
+
+    def attackersOf(self, sq, colour, occupied):
+        """
+        Bitboard of the pieces of the given colour attacking sq, with sliders blocked by occupied.
+        """
+        pieces = self.pieces
+        queens = pieces[colour + QUEEN]
+        return (knightAttacks[sq] & pieces[colour + KNIGHT]) | (kingAttacks[sq] & pieces[colour + KING]) | \
+            (pawnAttacks[WHITE + BLACK - colour][sq] & pieces[colour + PAWN]) | \
+            (rookAttacks(sq, occupied) & (pieces[colour + ROOK] | queens)) | \
+            (bishopAttacks(sq, occupied) & (pieces[colour + BISHOP] | queens))
+
+    def squareUnderAttack(self, row, col):
+        """
+        Determine if enemy can attack the square row col
+        """
+        enemy = BLACK if self.whiteToMove else WHITE
+        return self.attackersOf(row * 8 + col, enemy, self.occupancy(WHITE) | self.occupancy(BLACK)) != 0
+
+    def getPins(self, king_sq, ally, enemy, occupied):
+        """
+        Map every pinned ally square to the squares it may still move to (the pin line up to and including the pinner).
+        """
+        pins = {}
+        pieces = self.pieces
+        queens = pieces[enemy + QUEEN]
+        orthogonal = pieces[enemy + ROOK] | queens
+        diagonal = pieces[enemy + BISHOP] | queens
+        for d in range(8):
+            sliders = orthogonal if d < 4 else diagonal
+            if not rays[d][king_sq] & sliders:
+                continue
+            first = rayAttacks(d, king_sq, occupied) & ally
+            if not first:
+                continue
+            # look through the ally piece for an enemy slider
+            beyond = rayAttacks(d, king_sq, occupied ^ first) & sliders
+            if beyond:
+                pinner = beyond.bit_length() - 1
+                pins[first.bit_length() - 1] = betweenSquares[king_sq][pinner] | beyond
+        return pins
+
+    def getValidMoves(self):
+        """
+        All moves considering checks.
+        """
+        pieces = self.pieces
+        mailbox = self.mailbox
+        if self.whiteToMove:
+            ally, enemy = WHITE, BLACK
+        else:
+            ally, enemy = BLACK, WHITE
+        ally_bits = self.occupancy(ally)
+        enemy_bits = self.occupancy(enemy)
+        occupied = ally_bits | enemy_bits
+        king_sq = pieces[ally + KING].bit_length() - 1
+        king_move = king_sq | (ally + KING) << 16  # start square and piece of every king move
+        moves = []
+
+        checkers = self.attackersOf(king_sq, enemy, occupied)
+        self.inCheck = checkers != 0
+
+        # king moves, attacks are computed without our king so it cannot hide behind itself
+        without_king = occupied ^ (1 << king_sq)
+        for end_sq in squares(kingAttacks[king_sq] & ~ally_bits):
+            if not self.attackersOf(end_sq, enemy, without_king):
+                moves.append(king_move | end_sq << 6 | mailbox[end_sq] << 20)
+
+        if checkers & (checkers - 1) == 0:  # not in double check
+            if checkers:
+                checker_sq = checkers.bit_length() - 1
+                target_mask = betweenSquares[king_sq][checker_sq] | checkers
+            else:
+                target_mask = ~ally_bits
+            target_mask &= ~ally_bits
+            pins = self.getPins(king_sq, ally_bits, enemy, occupied)
+
+            # knights, bishops, rooks and queens
+            for piece in (KNIGHT, BISHOP, ROOK, QUEEN):
+                for start_sq in squares(pieces[ally + piece]):
+                    if piece == KNIGHT:
+                        if start_sq in pins:  # a pinned knight can never move
+                            continue
+                        targets = knightAttacks[start_sq]
+                    elif piece == BISHOP:
+                        targets = bishopAttacks(start_sq, occupied)
+                    elif piece == ROOK:
+                        targets = rookAttacks(start_sq, occupied)
+                    else:
+                        targets = rookAttacks(start_sq, occupied) | bishopAttacks(start_sq, occupied)
+                    targets &= target_mask
+                    if start_sq in pins:
+                        targets &= pins[start_sq]
+                    move = start_sq | (ally + piece) << 16
+                    for end_sq in squares(targets):
+                        moves.append(move | end_sq << 6 | mailbox[end_sq] << 20)
+
+            # pawns, generated set-wise and mapped back to their start square by the shift used
+            pawns = pieces[ally + PAWN]
+            empty = ~occupied
+            if ally == WHITE:
+                single = (pawns >> 8) & empty
+                double = ((single & rank3) >> 8) & empty
+                left = ((pawns & ~fileA) >> 9) & enemy_bits
+                right = ((pawns & ~fileH) >> 7) & enemy_bits
+                pushes = ((single, 8), (double, 16), (left, 9), (right, 7))
+            else:
+                single = (pawns << 8) & empty
+                double = ((single & rank6) << 8) & empty
+                left = ((pawns & ~fileA) << 7) & enemy_bits
+                right = ((pawns & ~fileH) << 9) & enemy_bits
+                pushes = ((single, -8), (double, -16), (left, -7), (right, -9))
+            for targets, offset in pushes:
+                for end_sq in squares(targets & target_mask):
+                    start_sq = end_sq + offset
+                    if start_sq in pins and not pins[start_sq] & (1 << end_sq):
+                        continue
+                    move = start_sq | end_sq << 6 | (ally + PAWN) << 16 | mailbox[end_sq] << 20
+                    if (1 << end_sq) & (rank8 | rank1):
+                        for i in range(len(Move.promotion_pieces)):
+                            moves.append(move | MOVE_PROMOTION | i << 14)
+                    else:
+                        moves.append(move)
+
+            # en passant, checked by playing it on the occupancy since it removes two pieces from one rank
+            if self.enpassantPossible != ():
+                ep_row, ep_col = self.enpassantPossible
+                ep_sq = ep_row * 8 + ep_col
+                captured_sq = ep_sq + (8 if ally == WHITE else -8)
+                for start_sq in squares(pawnAttacks[enemy][ep_sq] & pawns):
+                    after = (occupied ^ (1 << start_sq) ^ (1 << captured_sq)) | (1 << ep_sq)
+                    pieces[enemy + PAWN] ^= 1 << captured_sq
+                    attacked = self.attackersOf(king_sq, enemy, after)
+                    pieces[enemy + PAWN] ^= 1 << captured_sq
+                    if not attacked:
+                        moves.append(start_sq | ep_sq << 6 | MOVE_ENPASSANT | (ally + PAWN) << 16 |
+                                     (enemy + PAWN) << 20)
+
+            # castling, the king may not start on, pass through or land on an attacked square
+            if not checkers:
+                kingside, queenside = (WKS, WQS) if ally == WHITE else (BKS, BQS)
+                if self.castlingBits & kingside and not occupied & (0b11 << (king_sq + 1)):
+                    if not self.attackersOf(king_sq + 1, enemy, occupied) and \
+                            not self.attackersOf(king_sq + 2, enemy, occupied):
+                        moves.append(king_move | (king_sq + 2) << 6 | MOVE_CASTLE)
+                if self.castlingBits & queenside and not occupied & (0b111 << (king_sq - 3)):
+                    if not self.attackersOf(king_sq - 1, enemy, occupied) and \
+                            not self.attackersOf(king_sq - 2, enemy, occupied):
+                        moves.append(king_move | (king_sq - 2) << 6 | MOVE_CASTLE)
+
+        if len(moves) == 0:
+            if self.inCheck:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+        else:
+            self.checkmate = False
+            self.stalemate = False
+        return moves
@@ -1,156 +1,71 @@
-import pygame
-import webbrowser
-
-boardWidth = boardHeight = 600
-boardDimension = 8
-squareSize = boardHeight // boardDimension
-chessPieces = {}
-
-# initialize a global directory of images to be called exactly once in the main.
-def loadImages():
-
-    # loop through each piece, load it and scale it
-    pieces = ['wp', 'wR', 'wN', 'wB', 'wK', 'wQ', 'bp', 'bR', 'bN', 'bB', 'bK', 'bQ']
-    for piece in pieces:
-        chessPieces[piece] = pygame.transform.scale(pygame.image.load("pieces/" + piece + ".png"), (squareSize, squareSize))
-
-# main game function/handling user input
-def main():
-    
-    pygame.init()
-    screen = pygame.display.set_mode((600, 600))
-    gameState = GameState()
-    validMoves = gameState.getValidMoves()
-    isMoveMade = False  # flag variable for when a move is made, keep track to generate new valid moves
-    loadImages()  # do this only once before while loop
-    running = True
-    selectedSquare = ()  # no square is selected initially, this will keep track of the last click of the user 
-    playerClicks = []  # this will keep track of player clicks 
-    gameOver = False
-
-    while running:
- 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-            # mouse handler, get the position of the selected square
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if not gameOver:
-                    location = pygame.mouse.get_pos()  # (x, y) location of the mouse
-                    column = location[0] // squareSize
-                    row = location[1] // squareSize
-                    if selectedSquare == (row, column) or column >= 8:  # user clicked the same square twice
-                        selectedSquare = ()  # deselect
-                        playerClicks = []  # clear clicks
-                    # store the selected square
-                    else:
-                        selectedSquare = (row, column)
-                        playerClicks.append(selectedSquare)  
-                    # make the move
-                    if len(playerClicks) == 2:  # after 2nd click
-                        move = Move(playerClicks[0], playerClicks[1], gameState.board)
-                        for i in range(len(validMoves)):
-                            if move == validMoves[i]:
-                                gameState.makeMove(validMoves[i])
-                                isMoveMade = True
-                                selectedSquare = ()  # reset user clicks
-                                playerClicks = []
-                        if not isMoveMade:
-                            playerClicks = [selectedSquare]
-            # key handler
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_z:  # undo when 'z' is pressed
-                    gameState.undoMove()
-                    isMoveMade = True
-                    gameOver = False
-                if event.key == pygame.K_r:  # reset the game when 'r' is pressed, add a way back to the menu straight from the gave over screen after patching the AI
-                    gameState = GameState()
-                    validMoves = gameState.getValidMoves()
-                    selectedSquare = ()
-                    playerClicks = []
-                    isMoveMade = False
-                    gameOver = False
-                
-        if isMoveMade:
-            # generate a new set of valid moves
-            validMoves = gameState.getValidMoves()
-            isMoveMade = False
-
-        drawGameState(screen, gameState, validMoves, selectedSquare)        
-
-        if gameState.checkmate:
-            gameOver = True
-            if gameState.whiteToMove:
-                drawEndGameText(screen, "Black wins by checkmate")
-            else:
-                drawEndGameText(screen, "White wins by checkmate")
-        elif gameState.stalemate:
-            gameOver = True
-            drawEndGameText(screen, "Stalemate")
-        pygame.display.flip()
-
-
-def drawGameState(screen, gameState, validMoves, selectedSquare):
-
-    drawBoard(screen)  # draw squares on the board
-    drawPieces(screen, gameState.board)  # draw pieces on top of those squares
-    highlightSquares(screen, gameState, validMoves, selectedSquare)
-
-      
-def highlightSquares(screen, gameState, validMoves, selectedSquare):
- 
-    if (len(gameState.moveLog)) > 0:
-        lastMove = gameState.moveLog[-1]
-        screen2 = pygame.Surface((squareSize, squareSize))
-        screen2.set_alpha(100)
-        screen2.fill(pygame.Color(10, 255, 255))
-        screen.blit(screen2, (lastMove.end_col * squareSize, lastMove.end_row * squareSize))
-    if selectedSquare != ():
-        row = selectedSquare[0]
-        column = selectedSquare[1]
-        if gameState.board[row][column][0] == ('w' if gameState.whiteToMove else 'b'): 
-            # highlight selected square
-            screen2 = pygame.Surface((squareSize, squareSize))
-            screen2.set_alpha(100)  # transparency (0 is transparent, 255 opaque)
-            screen2.fill(pygame.Color(175, 225, 175))
-            screen.blit(screen2, (column * squareSize, row * squareSize))
-            # highlight moves from that square
-            screen2.fill(pygame.Color('yellow'))
-            for move in validMoves:
-                if move.start_row == row and move.start_col == column:
-                    screen.blit(screen2, (move.end_col * squareSize, move.end_row * squareSize))
-    
-# draw the board
-def drawBoard(screen):
- 
-    global colors
-    colors = [pygame.Color("white"), pygame.Color(222,184,135)]
-    for row in range(boardDimension):
-        for column in range(boardDimension):
-            color = colors[((row + column) % 2)]
-            pygame.draw.rect(screen, color, pygame.Rect(column * squareSize, row * squareSize, squareSize, squareSize))
-
-# draw the chess pieces
-def drawPieces(screen, board):
- 
-    for row in range(boardDimension):
-        for column in range(boardDimension):
-            piece = board[row][column]
-            if piece != "--":
-                screen.blit(chessPieces[piece], pygame.Rect(column * squareSize, row * squareSize, squareSize, squareSize))
-
-# displaying game result when the game is over
-def drawEndGameText(screen, text):
-    checkmate = buttonFont.render(text, False, pygame.Color("grey"))
-    textLocation = pygame.Rect(0, 0, boardWidth, boardHeight).move(boardWidth/2 - checkmate.get_width()/2, boardHeight/2 - checkmate.get_height()/2)
-    screen.blit(checkmate, textLocation)
-    stalemate = buttonFont.render(text, False, pygame.Color('black'))
-    screen.blit(stalemate, textLocation.move(2, 2))
+import random
+from collections import OrderedDict
+
+from Evaluation import PHASE_TOTAL, egTables, mgTables, phaseWeights
+
+# the rules engine: GameState, Move and the tables behind them. nothing here needs pygame, the window and the menu
+# are in ChessGui.py, so the engine can be imported by the search, the tools and worker processes at no cost
+
+# moves are packed into a single integer so move generation allocates nothing:
+# bits 0-5 start square, bits 6-11 end square (square = row * 8 + col), bits 12-13 kind of move,
+# bits 14-15 promotion piece (index into Move.promotion_pieces), bits 16-19 piece moved, bits 20-23 piece captured.
+# pieces are coded by their index in pieceNames, 0 being an empty square. Move.fromCode turns a packed move into a
+# Move object for display and notation
+pieceNames = ["--", "wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"]
+pieceCodes = {name: code for code, name in enumerate(pieceNames)}
+MOVE_ENPASSANT = 1 << 12
+MOVE_CASTLE = 2 << 12
+MOVE_PROMOTION = 3 << 12
+MOVE_KIND = 3 << 12  # mask for the kind bits
+
+# FEN letters of the pieces, upper case for white
+fenPieces = {"p": "bp", "n": "bN", "b": "bB", "r": "bR", "q": "bQ", "k": "bK",
+             "P": "wp", "N": "wN", "B": "wB", "R": "wR", "Q": "wQ", "K": "wK"}
+pieceFenLetters = {name: letter for letter, name in fenPieces.items()}
+
+# zobrist hashing: every (piece, square) pair, the side to move, each set of castling rights and each en passant file
+# gets a random 64-bit number, a position's key is the XOR of the numbers that describe it.
+# a fixed seed keeps the keys identical across runs and processes so they can be stored and shared
+zobristRandom = random.Random(20230101)
+zobristPieces = {piece: [zobristRandom.getrandbits(64) for square in range(64)]
+                 for piece in ['wp', 'wR', 'wN', 'wB', 'wK', 'wQ', 'bp', 'bR', 'bN', 'bB', 'bK', 'bQ']}
+zobristBlackToMove = zobristRandom.getrandbits(64)
+zobristCastling = [zobristRandom.getrandbits(64) for rights in range(16)]  # indexed by CastleRights.getIndex()
+zobristEnpassant = [zobristRandom.getrandbits(64) for col in range(8)]  # indexed by the file of the en passant square
+
+# precomputed attack patterns, indexed [row][col] and holding (row, col) squares, built once at import
+# directions 0-3 are orthogonal and 4-7 diagonal, the same order checkForPinsAndChecks scans in
+rayDirections = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+knightSteps = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+
+
+def buildSquareTable(steps):
+    """
+    For every square, the on-board squares one step away in each of the given (row, col) offsets.
+    """
+    return [[tuple((row + step[0], col + step[1]) for step in steps
+                   if 0 <= row + step[0] <= 7 and 0 <= col + step[1] <= 7)
+             for col in range(8)] for row in range(8)]
+
+
+knightSquares = buildSquareTable(knightSteps)
+kingSquares = buildSquareTable(rayDirections)
+# squares a pawn of the given colour must stand on to attack [row][col], white pawns capture towards row 0
+pawnAttackerSquares = {"w": buildSquareTable(((1, -1), (1, 1))), "b": buildSquareTable(((-1, -1), (-1, 1)))}
+# squares a pawn of the given colour standing on [row][col] attacks, the mirror image of the table above
+pawnAttackSquares = {"w": pawnAttackerSquares["b"], "b": pawnAttackerSquares["w"]}
+# raySquares[row][col][d] lists the squares from [row][col] to the edge of the board in direction d, nearest first
+raySquares = [[tuple(tuple((row + direction[0] * i, col + direction[1] * i) for i in range(1, 8)
+                           if 0 <= row + direction[0] * i <= 7 and 0 <= col + direction[1] * i <= 7)
+                     for direction in rayDirections)
+               for col in range(8)] for row in range(8)]
+# the ray directions each sliding piece moves along
+sliderDirections = {"R": (0, 1, 2, 3), "B": (4, 5, 6, 7), "Q": (0, 1, 2, 3, 4, 5, 6, 7)}
 
  # class responsible for most game functions
 class GameState:
 
-    def __init__(self):
+    def __init__(self, moveCache=None):
 
         # the first character of each index represents the colour of the piece
         # the second character of each index respresents the type of the piece
@@ -169,8 +84,12 @@ class GameState:
                               "B": self.getBishopMoves, "Q": self.getQueenMoves, "K": self.getKingMoves}
         self.whiteToMove = True # white always makes the first move
         self.moveLog = []
+        self.startHalfmoveClock = 0  # FEN move counters of the position the move log starts from
+        self.startFullmoveNumber = 1
         self.whiteKingLocation = (7, 4)
         self.black_king_location = (0, 4)
+        self.pieceSquares = {"w": set(), "b": set()}  # occupied squares of each colour, kept up to date by makeMove and undoMove
+        self.rebuildPieceSquares()
         self.checkmate = False
         self.stalemate = False
         self.inCheck = False
@@ -180,48 +99,105 @@ class GameState:
         self.enpassantPossibleLog = [self.enpassantPossible]
         self.currentCastlingRights = CastleRights(True, True, True, True)
         self.castleRightsLog = [CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks, self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)]
-
-    # allow the player to make a move
+        self.zobristKey = self.computeZobristKey()  # 64-bit position key, kept up to date by makeMove and undoMove
+        self.zobristKeyLog = [self.zobristKey]
+        # material and piece-square scores from white's point of view, kept up to date by makeMove and undoMove
+        self.mgScore, self.egScore, self.phase = self.computeEvaluation()
+        self.evaluationLog = [(self.mgScore, self.egScore, self.phase)]
+        # legal moves of positions already seen, only worth it where positions come back often (the GUI, replaying
+        # games), a search rarely sees a position twice and would pay for the bookkeeping at every node
+        self.moveCache = moveCache
+
+    # allow the player to make a move, given as a packed move from getValidMoves
     def makeMove(self, move):
   
-        self.board[move.start_row][move.start_col] = "--"
-        self.board[move.end_row][move.end_col] = move.piece_moved
+        start_sq = move & 63
+        end_sq = move >> 6 & 63
+        start_row, start_col = divmod(start_sq, 8)
+        end_row, end_col = divmod(end_sq, 8)
+        kind = move & MOVE_KIND
+        piece_moved = pieceNames[move >> 16 & 15]
+        piece_captured = pieceNames[move >> 20 & 15]
+
+        # remove the moving piece and anything captured on the landing square from the key, the rest is added below
+        zobrist_key = self.zobristKey ^ zobristPieces[piece_moved][start_sq]
+        if piece_captured != "--" and kind != MOVE_ENPASSANT:
+            zobrist_key ^= zobristPieces[piece_captured][end_sq]
+        if self.enpassantPossible != ():
+            zobrist_key ^= zobristEnpassant[self.enpassantPossible[1]]
+        zobrist_key ^= zobristCastling[self.currentCastlingRights.getIndex()] ^ zobristBlackToMove
+        # and the same for the evaluation
+        mg_score = self.mgScore - mgTables[piece_moved][start_sq]
+        eg_score = self.egScore - egTables[piece_moved][start_sq]
+        phase = self.phase
+        if piece_captured != "--":
+            captured_sq = start_row * 8 + end_col if kind == MOVE_ENPASSANT else end_sq
+            mg_score -= mgTables[piece_captured][captured_sq]
+            eg_score -= egTables[piece_captured][captured_sq]
+            phase -= phaseWeights[piece_captured[1]]
+
+        self.board[start_row][start_col] = "--"
+        self.board[end_row][end_col] = piece_moved
+        ally_squares = self.pieceSquares[piece_moved[0]]
+        ally_squares.remove((start_row, start_col))
+        ally_squares.add((end_row, end_col))
+        if piece_captured != "--":
+            if kind == MOVE_ENPASSANT:
+                self.pieceSquares[piece_captured[0]].remove((start_row, end_col))
+            else:
+                self.pieceSquares[piece_captured[0]].remove((end_row, end_col))
         self.moveLog.append(move)  # log the move so we can undo it later
         self.whiteToMove = not self.whiteToMove  # switch players
         # update king's location if moved, important to check castling rights
-        if move.piece_moved == "wK":
-            self.whiteKingLocation = (move.end_row, move.end_col)
-        elif move.piece_moved == "bK":
-            self.black_king_location = (move.end_row, move.end_col)
-
-        # pawn promotion
-        if move.is_pawn_promotion:
-            # if not is_AI:
-            #    promoted_piece = input("Promote to Q, R, B, or N:") #take this to UI later
-            #    self.board[move.end_row][move.end_col] = move.piece_moved[0] + promoted_piece
-            # else:
-            self.board[move.end_row][move.end_col] = move.piece_moved[0] + "Q"
+        if piece_moved == "wK":
+            self.whiteKingLocation = (end_row, end_col)
+        elif piece_moved == "bK":
+            self.black_king_location = (end_row, end_col)
+
+        # pawn promotion, the promotion piece is part of the move for players and the AI alike
+        if kind == MOVE_PROMOTION:
+            self.board[end_row][end_col] = piece_moved[0] + Move.promotion_pieces[move >> 14 & 3]
+        piece_landed = self.board[end_row][end_col]
+        zobrist_key ^= zobristPieces[piece_landed][end_sq]
+        mg_score += mgTables[piece_landed][end_sq]
+        eg_score += egTables[piece_landed][end_sq]
+        if kind == MOVE_PROMOTION:
+            phase += phaseWeights[piece_landed[1]]
 
         # enpassant move
-        if move.is_enpassant_move:
-            self.board[move.start_row][move.end_col] = "--"  # capturing the pawn
+        if kind == MOVE_ENPASSANT:
+            self.board[start_row][end_col] = "--"  # capturing the pawn
+            zobrist_key ^= zobristPieces[piece_captured][start_row * 8 + end_col]
 
         # update enpassant_possible variable
-        if move.piece_moved[1] == "p" and abs(move.start_row - move.end_row) == 2:  # only on 2 square pawn advance
-            self.enpassantPossible = ((move.start_row + move.end_row) // 2, move.start_col)
+        if piece_moved[1] == "p" and abs(start_row - end_row) == 2:  # only on 2 square pawn advance
+            self.enpassantPossible = ((start_row + end_row) // 2, start_col)
+            zobrist_key ^= zobristEnpassant[start_col]
         else:
             self.enpassantPossible = ()
 
         # castle move
-        if move.is_castle_move:
-            if move.end_col - move.start_col == 2:  # kingside castle move
-                self.board[move.end_row][move.end_col - 1] = self.board[move.end_row][
-                    move.end_col + 1]  # moves the rook 
-                self.board[move.end_row][move.end_col + 1] = '--'  # erase old rook
+        if kind == MOVE_CASTLE:
+            rook = piece_moved[0] + "R"
+            rook_keys = zobristPieces[rook]
+            if end_col - start_col == 2:  # kingside castle move
+                self.board[end_row][end_col - 1] = self.board[end_row][
+                    end_col + 1]  # moves the rook 
+                self.board[end_row][end_col + 1] = '--'  # erase old rook
+                ally_squares.remove((end_row, end_col + 1))
+                ally_squares.add((end_row, end_col - 1))
+                zobrist_key ^= rook_keys[end_sq + 1] ^ rook_keys[end_sq - 1]
+                mg_score += mgTables[rook][end_sq - 1] - mgTables[rook][end_sq + 1]
+                eg_score += egTables[rook][end_sq - 1] - egTables[rook][end_sq + 1]
             else:  # queenside castle 
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][
-                    move.end_col - 2]  # moves the rook 
-                self.board[move.end_row][move.end_col - 2] = '--'  # erase old rook
+                self.board[end_row][end_col + 1] = self.board[end_row][
+                    end_col - 2]  # moves the rook 
+                self.board[end_row][end_col - 2] = '--'  # erase old rook
+                ally_squares.remove((end_row, end_col - 2))
+                ally_squares.add((end_row, end_col + 1))
+                zobrist_key ^= rook_keys[end_sq - 2] ^ rook_keys[end_sq + 1]
+                mg_score += mgTables[rook][end_sq + 1] - mgTables[rook][end_sq - 2]
+                eg_score += egTables[rook][end_sq + 1] - egTables[rook][end_sq - 2]
 
         self.enpassantPossibleLog.append(self.enpassantPossible)
 
@@ -229,78 +205,335 @@ class GameState:
         self.updateCastleRights(move)
         self.castleRightsLog.append(CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
                                                    self.currentCastlingRights.wqs, self.currentCastlingRights.bqs))
+        self.zobristKey = zobrist_key ^ zobristCastling[self.currentCastlingRights.getIndex()]
+        self.zobristKeyLog.append(self.zobristKey)
+        self.mgScore, self.egScore, self.phase = mg_score, eg_score, phase
+        self.evaluationLog.append((mg_score, eg_score, phase))
 
     def undoMove(self):
 
         # undo the last move, can be done multiple times
         if len(self.moveLog) != 0:  # make sure that there is a move to undo
             move = self.moveLog.pop()
-            self.board[move.start_row][move.start_col] = move.piece_moved
-            self.board[move.end_row][move.end_col] = move.piece_captured
+            start_row, start_col = divmod(move & 63, 8)
+            end_row, end_col = divmod(move >> 6 & 63, 8)
+            kind = move & MOVE_KIND
+            piece_moved = pieceNames[move >> 16 & 15]
+            piece_captured = pieceNames[move >> 20 & 15]
+            self.board[start_row][start_col] = piece_moved
+            self.board[end_row][end_col] = piece_captured
+            ally_squares = self.pieceSquares[piece_moved[0]]
+            ally_squares.remove((end_row, end_col))
+            ally_squares.add((start_row, start_col))
+            if piece_captured != "--":
+                if kind == MOVE_ENPASSANT:
+                    self.pieceSquares[piece_captured[0]].add((start_row, end_col))
+                else:
+                    self.pieceSquares[piece_captured[0]].add((end_row, end_col))
             self.whiteToMove = not self.whiteToMove  # swap players
             # update the king's position if needed
-            if move.piece_moved == "wK":
-                self.whiteKingLocation = (move.start_row, move.start_col)
-            elif move.piece_moved == "bK":
-                self.black_king_location = (move.start_row, move.start_col)
+            if piece_moved == "wK":
+                self.whiteKingLocation = (start_row, start_col)
+            elif piece_moved == "bK":
+                self.black_king_location = (start_row, start_col)
             # undo en passant move
-            if move.is_enpassant_move:
-                self.board[move.end_row][move.end_col] = "--"  # leave landing square blank
-                self.board[move.start_row][move.end_col] = move.piece_captured
+            if kind == MOVE_ENPASSANT:
+                self.board[end_row][end_col] = "--"  # leave landing square blank
+                self.board[start_row][end_col] = piece_captured
 
             self.enpassantPossibleLog.pop()
             self.enpassantPossible = self.enpassantPossibleLog[-1]
 
             # undo castle rights
             self.castleRightsLog.pop()  # get rid of the new castle rights from the move we are undoing
-            self.currentCastlingRights = self.castleRightsLog[
-                -1]  # set the current castle rights to the last one in the list
+            last_rights = self.castleRightsLog[-1]  # set the current castle rights to a copy of the last one in the list
+            self.currentCastlingRights = CastleRights(last_rights.wks, last_rights.bks, last_rights.wqs, last_rights.bqs)
+            # restore the zobrist key
+            self.zobristKeyLog.pop()
+            self.zobristKey = self.zobristKeyLog[-1]
+            # and the evaluation
+            self.evaluationLog.pop()
+            self.mgScore, self.egScore, self.phase = self.evaluationLog[-1]
             # undo the castle move
-            if move.is_castle_move:
-                if move.end_col - move.start_col == 2:  # king-side
-                    self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 1]
-                    self.board[move.end_row][move.end_col - 1] = '--'
+            if kind == MOVE_CASTLE:
+                if end_col - start_col == 2:  # king-side
+                    self.board[end_row][end_col + 1] = self.board[end_row][end_col - 1]
+                    self.board[end_row][end_col - 1] = '--'
+                    ally_squares.remove((end_row, end_col - 1))
+                    ally_squares.add((end_row, end_col + 1))
                 else:  # queen-side
-                    self.board[move.end_row][move.end_col - 2] = self.board[move.end_row][move.end_col + 1]
-                    self.board[move.end_row][move.end_col + 1] = '--'
+                    self.board[end_row][end_col - 2] = self.board[end_row][end_col + 1]
+                    self.board[end_row][end_col + 1] = '--'
+                    ally_squares.remove((end_row, end_col + 1))
+                    ally_squares.add((end_row, end_col - 2))
             self.checkmate = False
             self.stalemate = False
 
+    @classmethod
+    def fromFen(cls, fen, moveCache=None):
+        """
+        Build a GameState for the position described by a FEN string.
+        """
+        gameState = cls(moveCache)
+        gameState.setFen(fen)
+        return gameState
+
+    def setFen(self, fen):
+        """
+        Set up the position described by a FEN string, so one GameState can be reused for many positions.
+        The move counters are optional, which also lets EPD lines through. Raises ValueError for a malformed FEN.
+        """
+        fields = fen.split()
+        if len(fields) < 2 or fields[1] not in ("w", "b"):
+            raise ValueError("invalid FEN %r" % fen)
+        board = []
+        for rank in fields[0].split("/"):
+            row = []
+            for char in rank:
+                if char.isdigit():
+                    row.extend(["--"] * int(char))
+                elif char in fenPieces:
+                    row.append(fenPieces[char])
+                else:
+                    raise ValueError("invalid FEN %r, unknown piece %r" % (fen, char))
+            if len(row) != 8:
+                raise ValueError("invalid FEN %r, a rank does not have 8 squares" % fen)
+            board.append(row)
+        if len(board) != 8:
+            raise ValueError("invalid FEN %r, it does not have 8 ranks" % fen)
+        for king in ("wK", "bK"):
+            if sum(row.count(king) for row in board) != 1:
+                raise ValueError("invalid FEN %r, each side needs exactly one king" % fen)
+        if any(piece[1] == "p" for piece in board[0] + board[7]):
+            raise ValueError("invalid FEN %r, a pawn on the first or last rank" % fen)
+        castling = fields[2] if len(fields) > 2 else "-"
+        if castling != "-" and any(char not in "KQkq" for char in castling):
+            raise ValueError("invalid FEN %r, bad castling field %r" % (fen, castling))
+        # a right is only kept while its king and rook are on their home squares, castling relies on it
+        castling = "".join(char for char, row, rook_col, color in
+                           (("K", 7, 7, "w"), ("Q", 7, 0, "w"), ("k", 0, 7, "b"), ("q", 0, 0, "b"))
+                           if char in castling and board[row][4] == color + "K" and board[row][rook_col] == color + "R")
+        enpassant = ()
+        if len(fields) > 3 and fields[3] != "-":
+            if len(fields[3]) != 2 or fields[3][0] not in "abcdefgh" or fields[3][1] not in "36":
+                raise ValueError("invalid FEN %r, bad en passant square %r" % (fen, fields[3]))
+            enpassant = (Move.ranks_to_rows[fields[3][1]], Move.files_to_cols[fields[3][0]])
+        halfmove_clock = int(fields[4]) if len(fields) > 4 and fields[4].isdigit() else 0
+        fullmove_number = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+        self.setPosition(board, fields[1] == "w",
+                         CastleRights("K" in castling, "k" in castling, "Q" in castling, "q" in castling), enpassant,
+                         halfmove_clock, fullmove_number)
+
+    def toFen(self):
+        """
+        FEN string of the current position.
+        """
+        ranks = []
+        for row in self.board:
+            rank = ""
+            empty = 0
+            for piece in row:
+                if piece == "--":
+                    empty += 1
+                else:
+                    if empty:
+                        rank += str(empty)
+                        empty = 0
+                    rank += pieceFenLetters[piece]
+            ranks.append(rank + str(empty) if empty else rank)
+        rights = self.currentCastlingRights
+        castling = ("K" if rights.wks else "") + ("Q" if rights.wqs else "") + ("k" if rights.bks else "") + \
+            ("q" if rights.bqs else "")
+        enpassant = "-"
+        if self.enpassantPossible != ():
+            enpassant = Move.cols_to_files[self.enpassantPossible[1]] + Move.rows_to_ranks[self.enpassantPossible[0]]
+        # the halfmove clock counts the moves since the last capture or pawn move
+        halfmove_clock = 0
+        for move in reversed(self.moveLog):
+            if move >> 20 & 15 or pieceNames[move >> 16 & 15][1] == "p":
+                break
+            halfmove_clock += 1
+        else:
+            halfmove_clock += self.startHalfmoveClock
+        start_black = self.whiteToMove == (len(self.moveLog) % 2 == 1)  # the move log started with black to move
+        fullmove_number = self.startFullmoveNumber + (len(self.moveLog) + start_black) // 2
+        return "%s %s %s %s %d %d" % ("/".join(ranks), "w" if self.whiteToMove else "b", castling or "-", enpassant,
+                                      halfmove_clock, fullmove_number)
+
+    def setPosition(self, board, whiteToMove=True, castleRights=None, enpassantPossible=(), halfmoveClock=0,
+                    fullmoveNumber=1):
+        """
+        Set up an arbitrary position, given as an 8x8 grid of piece names, and start a new move log from it.
+        The king locations, piece squares, zobrist key and evaluation are all rebuilt from the board.
+        """
+        if castleRights is None:
+            castleRights = CastleRights(False, False, False, False)
+        self.board = [list(row) for row in board]
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] == "wK":
+                    self.whiteKingLocation = (row, col)
+                elif self.board[row][col] == "bK":
+                    self.black_king_location = (row, col)
+        self.rebuildPieceSquares()
+        self.whiteToMove = whiteToMove
+        self.moveLog = []
+        self.startHalfmoveClock = halfmoveClock
+        self.startFullmoveNumber = fullmoveNumber
+        self.checkmate = False
+        self.stalemate = False
+        self.enpassantPossible = enpassantPossible
+        self.enpassantPossibleLog = [self.enpassantPossible]
+        self.currentCastlingRights = CastleRights(castleRights.wks, castleRights.bks, castleRights.wqs, castleRights.bqs)
+        self.castleRightsLog = [CastleRights(castleRights.wks, castleRights.bks, castleRights.wqs, castleRights.bqs)]
+        self.zobristKey = self.computeZobristKey()
+        self.zobristKeyLog = [self.zobristKey]
+        self.mgScore, self.egScore, self.phase = self.computeEvaluation()
+        self.evaluationLog = [(self.mgScore, self.egScore, self.phase)]
+
+    def rebuildPieceSquares(self):
+        """
+        Rebuild the per-colour index of occupied squares from the board, needed after the board is set up by hand.
+        """
+        self.pieceSquares["w"].clear()
+        self.pieceSquares["b"].clear()
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] != "--":
+                    self.pieceSquares[self.board[row][col][0]].add((row, col))
+
+    def computeZobristKey(self):
+        """
+        Build the zobrist key of the current position from scratch, used to verify the incremental updates.
+        """
+        zobrist_key = 0
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] != "--":
+                    zobrist_key ^= zobristPieces[self.board[row][col]][row * 8 + col]
+        if not self.whiteToMove:
+            zobrist_key ^= zobristBlackToMove
+        if self.enpassantPossible != ():
+            zobrist_key ^= zobristEnpassant[self.enpassantPossible[1]]
+        return zobrist_key ^ zobristCastling[self.currentCastlingRights.getIndex()]
+
+    def computeEvaluation(self):
+        """
+        Sum the middlegame and endgame scores and the game phase of the current position from scratch,
+        used to set up a position and to verify the incremental updates.
+        """
+        mg_score = eg_score = phase = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != "--":
+                    mg_score += mgTables[piece][row * 8 + col]
+                    eg_score += egTables[piece][row * 8 + col]
+                    phase += phaseWeights[piece[1]]
+        return mg_score, eg_score, phase
+
+    def evaluate(self):
+        """
+        Static evaluation in centipawns from the point of view of the side to move, an O(1) read of the scores
+        kept by makeMove, tapered from the middlegame to the endgame score as pieces come off the board.
+        """
+        phase = min(self.phase, PHASE_TOTAL)  # early promotions can push the phase past the starting position
+        score = (self.mgScore * phase + self.egScore * (PHASE_TOTAL - phase)) // PHASE_TOTAL
+        return score if self.whiteToMove else -score
+
     def updateCastleRights(self, move):
         """
         Update the castle rights given the move
         """
-        if move.piece_captured == "wR":
-            if move.end_col == 0:  # left rook
+        start_sq = move & 63
+        end_sq = move >> 6 & 63
+        piece_moved = pieceNames[move >> 16 & 15]
+        piece_captured = pieceNames[move >> 20 & 15]
+        if piece_captured == "wR":
+            if end_sq == 56:  # left rook
                 self.currentCastlingRights.wqs = False
-            elif move.end_col == 7:  # right rook
+            elif end_sq == 63:  # right rook
                 self.currentCastlingRights.wks = False
-        elif move.piece_captured == "bR":
-            if move.end_col == 0:  # left rook
+        elif piece_captured == "bR":
+            if end_sq == 0:  # left rook
                 self.currentCastlingRights.bqs = False
-            elif move.end_col == 7:  # right rook
+            elif end_sq == 7:  # right rook
                 self.currentCastlingRights.bks = False
 
-        if move.piece_moved == 'wK':
+        if piece_moved == 'wK':
             self.currentCastlingRights.wqs = False
             self.currentCastlingRights.wks = False
-        elif move.piece_moved == 'bK':
+        elif piece_moved == 'bK':
             self.currentCastlingRights.bqs = False
             self.currentCastlingRights.bks = False
-        elif move.piece_moved == 'wR':
-            if move.start_row == 7:
-                if move.start_col == 0:  # left rook
-                    self.currentCastlingRights.wqs = False
-                elif move.start_col == 7:  # right rook
-                    self.currentCastlingRights.wks = False
-        elif move.piece_moved == 'bR':
-            if move.start_row == 0:
-                if move.start_col == 0:  # left rook
-                    self.currentCastlingRights.bqs = False
-                elif move.start_col == 7:  # right rook
-                    self.currentCastlingRights.bks = False
+        elif piece_moved == 'wR':
+            if start_sq == 56:  # left rook
+                self.currentCastlingRights.wqs = False
+            elif start_sq == 63:  # right rook
+                self.currentCastlingRights.wks = False
+        elif piece_moved == 'bR':
+            if start_sq == 0:  # left rook
+                self.currentCastlingRights.bqs = False
+            elif start_sq == 7:  # right rook
+                self.currentCastlingRights.bks = False
+
+    def getSanNotation(self, move):
+        """
+        Standard algebraic notation of a legal move of the current position, such as Nbd7, exd6, e8=Q+ or O-O#.
+        The file or rank of the moving piece, or both, are added when another piece of its kind can reach the same square.
+        """
+        start_row, start_col = divmod(move & 63, 8)
+        end_sq = move >> 6 & 63
+        kind = move & MOVE_KIND
+        piece = pieceNames[move >> 16 & 15][1]
+        target = Move.cols_to_files[end_sq % 8] + Move.rows_to_ranks[end_sq // 8]
+        if kind == MOVE_CASTLE:
+            notation = "O-O" if end_sq % 8 == 6 else "O-O-O"
+        elif piece == "p":
+            notation = Move.cols_to_files[start_col] + "x" + target if move >> 20 else target
+            if kind == MOVE_PROMOTION:
+                notation += "=" + Move.promotion_pieces[move >> 14 & 3]
+        else:
+            others = [other & 63 for other in self.getValidMoves() if other >> 6 & 63 == end_sq and
+                      other >> 16 & 15 == move >> 16 & 15 and other & 63 != move & 63]
+            origin = ""
+            if others:
+                if all(other % 8 != start_col for other in others):
+                    origin = Move.cols_to_files[start_col]
+                elif all(other // 8 != start_row for other in others):
+                    origin = Move.rows_to_ranks[start_row]
+                else:
+                    origin = Move.cols_to_files[start_col] + Move.rows_to_ranks[start_row]
+            notation = piece + origin + ("x" if move >> 20 else "") + target
+        # the check and mate flags belong to the current position, keep them while looking at the next one
+        in_check, checkmate, stalemate = self.inCheck, self.checkmate, self.stalemate
+        self.makeMove(move)
+        self.getValidMoves()
+        if self.checkmate:
+            notation += "#"
+        elif self.inCheck:
+            notation += "+"
+        self.undoMove()
+        self.inCheck, self.checkmate, self.stalemate = in_check, checkmate, stalemate
+        return notation
 
     def getValidMoves(self):
+        """
+        All moves considering checks, looked up in the move cache when the position has been seen before.
+        The zobrist key covers the side to move, castle rights and en passant square, so positions reached
+        again through undoMove or a different move order share an entry.
+        """
+        if self.moveCache is None:
+            return self.generateValidMoves()
+        entry = self.moveCache.get(self.zobristKey)
+        if entry is None:
+            moves = self.generateValidMoves()
+            self.moveCache.put(self.zobristKey, (tuple(moves), self.inCheck, self.checkmate, self.stalemate))
+            return moves
+        moves, self.inCheck, self.checkmate, self.stalemate = entry
+        return list(moves)  # callers may change the list they get
+
+    def generateValidMoves(self):
         """
         All moves considering checks.
         """
@@ -318,30 +551,7 @@ class GameState:
             king_col = self.black_king_location[1]
         if self.inCheck:
             if len(self.checks) == 1:  # only 1 check, block the check or move the king
-                moves = self.getAllPossibleMoves()
-                # to block the check you must put a piece into one of the squares between the enemy piece and your king
-                check = self.checks[0]  # check information
-                check_row = check[0]
-                check_col = check[1]
-                piece_checking = self.board[check_row][check_col]
-                valid_squares = []  # squares that pieces can move to
-                # if knight, must capture the knight or move your king, other pieces can be blocked
-                if piece_checking[1] == "N":
-                    valid_squares = [(check_row, check_col)]
-                else:
-                    for i in range(1, 8):
-                        valid_square = (king_row + check[2] * i,
-                                        king_col + check[3] * i)  # check[2] and check[3] are the check directions
-                        valid_squares.append(valid_square)
-                        if valid_square[0] == check_row and valid_square[
-                            1] == check_col:  # once you get to piece and check
-                            break
-                # get rid of any moves that don't block check or move king
-                for i in range(len(moves) - 1, -1, -1):  # iterate through the list backwards when removing elements
-                    if moves[i].piece_moved[1] != "K":  # move doesn't move king so it must block or capture
-                        if not (moves[i].end_row,
-                                moves[i].end_col) in valid_squares:  # move doesn't block or capture piece
-                            moves.remove(moves[i])
+                self.getEvasionMoves(king_row, king_col, self.checks[0], moves)
             else:  # double check, king has to move
                 self.getKingMoves(king_row, king_col, moves)
         else:  # not in check - all moves are fine
@@ -353,7 +563,7 @@ class GameState:
 
         # if no moves can be made then it is checkmate
         if len(moves) == 0:
-            if self.inCheck():
+            if self.inCheck:
                 self.checkmate = True
             # moves can be made by the other player, it is just not their turn when it is stalemate
             else:
@@ -365,6 +575,64 @@ class GameState:
         self.currentCastlingRights = temp_castle_rights
         return moves
 
+    def iterValidMoves(self):
+        """
+        Yield the same moves as getValidMoves, lazily and in stages: captures and promotions, then quiet moves,
+        then castling. Pieces are generated one at a time, so a caller that stops early (a search cutoff, or a
+        checkmate test that only needs one legal move) never pays for the moves it did not look at.
+        The position may be changed between steps as long as it is restored before the iterator is resumed.
+        checkmate and stalemate are only updated once the iterator is exhausted.
+        """
+        in_check, pins, checks = self.checkForPinsAndChecks()
+        self.inCheck, self.pins, self.checks = in_check, pins, checks
+        if self.whiteToMove:
+            ally_color = "w"
+            king_row, king_col = self.whiteKingLocation
+        else:
+            ally_color = "b"
+            king_row, king_col = self.black_king_location
+        count = 0
+        quiet_moves = []
+
+        if in_check:  # evasions are produced directly and there are few of them, so they are generated together
+            moves = []
+            if len(checks) == 1:
+                self.getEvasionMoves(king_row, king_col, checks[0], moves)
+            else:  # double check, king has to move
+                self.getKingMoves(king_row, king_col, moves)
+            for move in moves:
+                if move >> 20 or move & MOVE_KIND == MOVE_PROMOTION:
+                    count += 1
+                    yield move
+                else:
+                    quiet_moves.append(move)
+        else:
+            # copy the occupied squares, the caller may make and undo moves between steps
+            for row, col in tuple(self.pieceSquares[ally_color]):
+                self.pins = pins  # a caller may have generated moves for other positions since the last step
+                moves = []
+                self.moveFunctions[self.board[row][col][1]](row, col, moves)
+                for move in moves:
+                    if move >> 20 or move & MOVE_KIND == MOVE_PROMOTION:  # capture or promotion
+                        count += 1
+                        yield move
+                    else:
+                        quiet_moves.append(move)
+
+        for move in quiet_moves:
+            count += 1
+            yield move
+
+        if not in_check:
+            castle_moves = []
+            self.getCastleMoves(king_row, king_col, castle_moves)
+            for move in castle_moves:
+                count += 1
+                yield move
+
+        self.checkmate = count == 0 and in_check
+        self.stalemate = count == 0 and not in_check
+
     def inCheck(self):
         """
         Determine if a current player is in check
@@ -378,27 +646,149 @@ class GameState:
         """
         Determine if enemy can attack the square row col
         """
-        self.whiteToMove = not self.whiteToMove  # switch to opponent's point of view
-        opponents_moves = self.getAllPossibleMoves()
-        self.whiteToMove = not self.whiteToMove
-        for move in opponents_moves:
-            if move.end_row == row and move.end_col == col:  # square is under attack
+        return self.isAttackedBy(row, col, "b" if self.whiteToMove else "w")
+
+    def squaresUnderAttack(self, squares):
+        """
+        Return the (row, col) squares from the given ones that the enemy attacks.
+        """
+        enemy_color = "b" if self.whiteToMove else "w"
+        return [square for square in squares if self.isAttackedBy(square[0], square[1], enemy_color)]
+
+    def isAttackedBy(self, row, col, color):
+        """
+        Determine if any piece of the given color attacks the square row col.
+        Scans outward from the square with the precomputed patterns and stops at the first attacker found.
+        """
+        board = self.board
+        knight, pawn, king = color + "N", color + "p", color + "K"
+        for end_row, end_col in knightSquares[row][col]:
+            if board[end_row][end_col] == knight:
+                return True
+        for end_row, end_col in pawnAttackerSquares[color][row][col]:
+            if board[end_row][end_col] == pawn:
                 return True
+        for end_row, end_col in kingSquares[row][col]:
+            if board[end_row][end_col] == king:
+                return True
+        rays = raySquares[row][col]
+        for j in range(8):
+            slider = "R" if j < 4 else "B"
+            for end_row, end_col in rays[j]:
+                end_piece = board[end_row][end_col]
+                if end_piece != "--":  # the first piece along the ray either attacks the square or blocks it
+                    if end_piece[0] == color and (end_piece[1] == slider or end_piece[1] == "Q"):
+                        return True
+                    break
         return False
 
+    def getAttackMap(self, color):
+        """
+        Set of every square attacked by a piece of the given color, including squares of defended pieces.
+        The other side's king does not block the sliders, so a king cannot step back along the line of a check.
+        """
+        board = self.board
+        enemy_king = ("b" if color == "w" else "w") + "K"
+        pawn_squares = pawnAttackSquares[color]
+        attacked = set()
+        for row, col in self.pieceSquares[color]:
+            piece_type = board[row][col][1]
+            if piece_type == "p":
+                attacked.update(pawn_squares[row][col])
+            elif piece_type == "N":
+                attacked.update(knightSquares[row][col])
+            elif piece_type == "K":
+                attacked.update(kingSquares[row][col])
+            else:
+                rays = raySquares[row][col]
+                for j in sliderDirections[piece_type]:
+                    for square in rays[j]:
+                        attacked.add(square)
+                        end_piece = board[square[0]][square[1]]
+                        if end_piece != "--" and end_piece != enemy_king:
+                            break
+        return attacked
+
     def getAllPossibleMoves(self):
         """
         All moves without considering checks.
         """
         moves = []
-        for row in range(len(self.board)):
-            for col in range(len(self.board[row])):
-                turn = self.board[row][col][0]
-                if (turn == "w" and self.whiteToMove) or (turn == "b" and not self.whiteToMove):
-                    piece = self.board[row][col][1]
-                    self.moveFunctions[piece](row, col, moves)  # calls appropriate move function based on piece type
+        # only visit the squares occupied by the side to move
+        for row, col in self.pieceSquares["w" if self.whiteToMove else "b"]:
+            piece = self.board[row][col][1]
+            self.moveFunctions[piece](row, col, moves)  # calls appropriate move function based on piece type
         return moves
 
+    def getEvasionMoves(self, king_row, king_col, check, moves):
+        """
+        Get the moves that answer a single check (capture the checking piece, block it or move the king)
+        and add them to the list. Only the capture and blocking squares are examined, looking outward from them
+        for pieces that can reach them, instead of generating every move and throwing most of them away.
+        """
+        board = self.board
+        check_row = check[0]
+        check_col = check[1]
+        # to block the check you must put a piece into one of the squares between the enemy piece and your king
+        # if knight, must capture the knight or move your king, other pieces can be blocked
+        if board[check_row][check_col][1] == "N":
+            valid_squares = [(check_row, check_col)]
+        else:
+            valid_squares = []
+            for i in range(1, 8):
+                valid_square = (king_row + check[2] * i, king_col + check[3] * i)  # check[2] and check[3] are the check directions
+                valid_squares.append(valid_square)
+                if valid_square[0] == check_row and valid_square[1] == check_col:  # once you get to piece and check
+                    break
+
+        ally_color = board[king_row][king_col][0]
+        if ally_color == "w":
+            move_amount = -1
+            start_row = 6
+            enemy_color = "b"
+        else:
+            move_amount = 1
+            start_row = 1
+            enemy_color = "w"
+        pawn = ally_color + "p"
+        knight = ally_color + "N"
+        pinned = [(pin[0], pin[1]) for pin in self.pins]  # a pinned piece can never get out of a check
+        for row, col in valid_squares:
+            end_piece = board[row][col]
+            end_move = (row * 8 + col) << 6 | pieceCodes[end_piece] << 20
+            for start in knightSquares[row][col]:
+                if board[start[0]][start[1]] == knight and start not in pinned:
+                    moves.append(end_move | (start[0] * 8 + start[1]) | pieceCodes[knight] << 16)
+            rays = raySquares[row][col]
+            for j in range(8):
+                slider = "R" if j < 4 else "B"
+                for start in rays[j]:
+                    piece = board[start[0]][start[1]]
+                    if piece != "--":  # only the first piece along the ray can reach the square
+                        if piece[0] == ally_color and (piece[1] == slider or piece[1] == "Q") and start not in pinned:
+                            moves.append(end_move | (start[0] * 8 + start[1]) | pieceCodes[piece] << 16)
+                        break
+            if end_piece == "--":  # pawns block by advancing
+                behind = row - move_amount
+                if 0 <= behind <= 7:
+                    if board[behind][col] == pawn:
+                        if (behind, col) not in pinned:
+                            self.addPawnMove((behind, col), (row, col), moves)
+                    elif board[behind][col] == "--" and behind == start_row + move_amount and \
+                            board[start_row][col] == pawn and (start_row, col) not in pinned:
+                        self.addPawnMove((start_row, col), (row, col), moves)
+            else:  # and capture the checking piece diagonally
+                for start in pawnAttackerSquares[ally_color][row][col]:
+                    if board[start[0]][start[1]] == pawn and start not in pinned:
+                        self.addPawnMove(start, (row, col), moves)
+        # en passant captures a checking pawn away from its landing square
+        if board[check_row][check_col] == enemy_color + "p" and self.enpassantPossible == (check_row + move_amount, check_col):
+            for start in pawnAttackerSquares[ally_color][check_row + move_amount][check_col]:
+                if board[start[0]][start[1]] == pawn and start not in pinned:
+                    moves.append((start[0] * 8 + start[1]) | ((check_row + move_amount) * 8 + check_col) << 6 |
+                                 MOVE_ENPASSANT | pieceCodes[pawn] << 16 | pieceCodes[enemy_color + "p"] << 20)
+        self.getKingMoves(king_row, king_col, moves)
+
     def checkForPinsAndChecks(self):
         pins = []  # squares pinned and the direction its pinned from
         checks = []  # squares where enemy is applying a check
@@ -414,53 +804,46 @@ class GameState:
             start_row = self.black_king_location[0]
             start_col = self.black_king_location[1]
         # check outwards from king for pins and checks, keep track of pins
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
-        for j in range(len(directions)):
-            direction = directions[j]
+        rays = raySquares[start_row][start_col]
+        for j in range(8):
+            direction = rayDirections[j]
             possible_pin = ()  # reset possible pins
-            for i in range(1, 8):
-                end_row = start_row + direction[0] * i
-                end_col = start_col + direction[1] * i
-                if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece[0] == ally_color and end_piece[1] != "K":
-                        if possible_pin == ():  # first allied piece could be pinned
-                            possible_pin = (end_row, end_col, direction[0], direction[1])
-                        else:  # 2nd allied piece - no check or pin from this direction
+            i = 0
+            for end_row, end_col in rays[j]:  # the ray stops at the edge of the board
+                i += 1
+                end_piece = self.board[end_row][end_col]
+                if end_piece[0] == ally_color and end_piece[1] != "K":
+                    if possible_pin == ():  # first allied piece could be pinned
+                        possible_pin = (end_row, end_col, direction[0], direction[1])
+                    else:  # 2nd allied piece - no check or pin from this direction
+                        break
+                elif end_piece[0] == enemy_color:
+                    enemy_type = end_piece[1]
+                    # 5 possibilities in this complex conditional
+                    # 1.) orthogonally away from king and piece is a rook
+                    # 2.) diagonally away from king and piece is a bishop
+                    # 3.) 1 square away diagonally from king and piece is a pawn
+                    # 4.) any direction and piece is a queen
+                    # 5.) any direction 1 square away and piece is a king
+                    if (0 <= j <= 3 and enemy_type == "R") or (4 <= j <= 7 and enemy_type == "B") or (
+                            i == 1 and enemy_type == "p" and (
+                            (enemy_color == "w" and 6 <= j <= 7) or (enemy_color == "b" and 4 <= j <= 5))) or (
+                            enemy_type == "Q") or (i == 1 and enemy_type == "K"):
+                        if possible_pin == ():  # no piece blocking, so check
+                            in_check = True
+                            checks.append((end_row, end_col, direction[0], direction[1]))
                             break
-                    elif end_piece[0] == enemy_color:
-                        enemy_type = end_piece[1]
-                        # 5 possibilities in this complex conditional
-                        # 1.) orthogonally away from king and piece is a rook
-                        # 2.) diagonally away from king and piece is a bishop
-                        # 3.) 1 square away diagonally from king and piece is a pawn
-                        # 4.) any direction and piece is a queen
-                        # 5.) any direction 1 square away and piece is a king
-                        if (0 <= j <= 3 and enemy_type == "R") or (4 <= j <= 7 and enemy_type == "B") or (
-                                i == 1 and enemy_type == "p" and (
-                                (enemy_color == "w" and 6 <= j <= 7) or (enemy_color == "b" and 4 <= j <= 5))) or (
-                                enemy_type == "Q") or (i == 1 and enemy_type == "K"):
-                            if possible_pin == ():  # no piece blocking, so check
-                                in_check = True
-                                checks.append((end_row, end_col, direction[0], direction[1]))
-                                break
-                            else:  # piece blocking so pin
-                                pins.append(possible_pin)
-                                break
-                        else:  # enemy piece not applying checks
+                        else:  # piece blocking so pin
+                            pins.append(possible_pin)
                             break
-                else:
-                    break  # off board
+                    else:  # enemy piece not applying checks
+                        break
         # check for knight checks
-        knight_moves = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
-        for move in knight_moves:
-            end_row = start_row + move[0]
-            end_col = start_col + move[1]
-            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] == enemy_color and end_piece[1] == "N":  # enemy knight attacking a king
-                    in_check = True
-                    checks.append((end_row, end_col, move[0], move[1]))
+        enemy_knight = enemy_color + "N"
+        for end_row, end_col in knightSquares[start_row][start_col]:
+            if self.board[end_row][end_col] == enemy_knight:  # enemy knight attacking a king
+                in_check = True
+                checks.append((end_row, end_col, end_row - start_row, end_col - start_col))
         return in_check, pins, checks
 
     def getPawnMoves(self, row, col, moves):
@@ -488,14 +871,14 @@ class GameState:
             king_row, king_col = self.black_king_location
 
         if self.board[row + move_amount][col] == "--":  # 1 square pawn advance
-            if not piece_pinned or pin_direction == (move_amount, 0):
-                moves.append(Move((row, col), (row + move_amount, col), self.board))
+            if not piece_pinned or pin_direction == (move_amount, 0) or pin_direction == (-move_amount, 0):
+                self.addPawnMove((row, col), (row + move_amount, col), moves)
                 if row == start_row and self.board[row + 2 * move_amount][col] == "--":  # 2 square pawn advance
-                    moves.append(Move((row, col), (row + 2 * move_amount, col), self.board))
+                    self.addPawnMove((row, col), (row + 2 * move_amount, col), moves)
         if col - 1 >= 0:  # capture to the left
-            if not piece_pinned or pin_direction == (move_amount, -1):
+            if not piece_pinned or pin_direction == (move_amount, -1) or pin_direction == (-move_amount, 1):
                 if self.board[row + move_amount][col - 1][0] == enemy_color:
-                    moves.append(Move((row, col), (row + move_amount, col - 1), self.board))
+                    self.addPawnMove((row, col), (row + move_amount, col - 1), moves)
                 if (row + move_amount, col - 1) == self.enpassantPossible:
                     attacking_piece = blocking_piece = False
                     if king_row == row:
@@ -510,18 +893,21 @@ class GameState:
                         for i in inside_range:
                             if self.board[row][i] != "--":  # some piece beside en-passant pawn blocks
                                 blocking_piece = True
-                        for i in outside_range:
+                        for i in outside_range:  # only the first piece past the pawns matters
                             square = self.board[row][i]
                             if square[0] == enemy_color and (square[1] == "R" or square[1] == "Q"):
                                 attacking_piece = True
+                                break
                             elif square != "--":
                                 blocking_piece = True
+                                break
                     if not attacking_piece or blocking_piece:
-                        moves.append(Move((row, col), (row + move_amount, col - 1), self.board, is_enpassant_move=True))
+                        moves.append((row * 8 + col) | ((row + move_amount) * 8 + col - 1) << 6 | MOVE_ENPASSANT |
+                                     pieceCodes[self.board[row][col]] << 16 | pieceCodes[enemy_color + "p"] << 20)
         if col + 1 <= 7:  # capture to the right
-            if not piece_pinned or pin_direction == (move_amount, +1):
+            if not piece_pinned or pin_direction == (move_amount, +1) or pin_direction == (-move_amount, -1):
                 if self.board[row + move_amount][col + 1][0] == enemy_color:
-                    moves.append(Move((row, col), (row + move_amount, col + 1), self.board))
+                    self.addPawnMove((row, col), (row + move_amount, col + 1), moves)
                 if (row + move_amount, col + 1) == self.enpassantPossible:
                     attacking_piece = blocking_piece = False
                     if king_row == row:
@@ -536,14 +922,31 @@ class GameState:
                         for i in inside_range:
                             if self.board[row][i] != "--":  # some piece beside en-passant pawn blocks
                                 blocking_piece = True
-                        for i in outside_range:
+                        for i in outside_range:  # only the first piece past the pawns matters
                             square = self.board[row][i]
                             if square[0] == enemy_color and (square[1] == "R" or square[1] == "Q"):
                                 attacking_piece = True
+                                break
                             elif square != "--":
                                 blocking_piece = True
+                                break
                     if not attacking_piece or blocking_piece:
-                        moves.append(Move((row, col), (row + move_amount, col + 1), self.board, is_enpassant_move=True))
+                        moves.append((row * 8 + col) | ((row + move_amount) * 8 + col + 1) << 6 | MOVE_ENPASSANT |
+                                     pieceCodes[self.board[row][col]] << 16 | pieceCodes[enemy_color + "p"] << 20)
+
+    def addPawnMove(self, start_square, end_square, moves):
+        """
+        Add a pawn move to the list, expanded into one move per promotion piece when it reaches the last rank.
+        """
+        start_row, start_col = start_square
+        end_row, end_col = end_square
+        move = (start_row * 8 + start_col) | (end_row * 8 + end_col) << 6 | \
+            pieceCodes[self.board[start_row][start_col]] << 16 | pieceCodes[self.board[end_row][end_col]] << 20
+        if end_row == 0 or end_row == 7:
+            for i in range(len(Move.promotion_pieces)):
+                moves.append(move | MOVE_PROMOTION | i << 14)
+        else:
+            moves.append(move)
 
     def getRookMoves(self, row, col, moves):
         """
@@ -560,24 +963,29 @@ class GameState:
                     self.pins.remove(self.pins[i])
                 break
 
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))  # up, left, down, right
+        self.addSliderMoves(row, col, sliderDirections["R"], piece_pinned, pin_direction, moves)
+
+    def addSliderMoves(self, row, col, directions, piece_pinned, pin_direction, moves):
+        """
+        Add the moves of the sliding piece at row col along the given ray directions, up to the first piece in each.
+        A pinned piece only moves along the line of its pin.
+        """
         enemy_color = "b" if self.whiteToMove else "w"
-        for direction in directions:
-            for i in range(1, 8):
-                end_row = row + direction[0] * i
-                end_col = col + direction[1] * i
-                if 0 <= end_row <= 7 and 0 <= end_col <= 7:  # check for possible moves only in boundaries of the board
-                    if not piece_pinned or pin_direction == direction or pin_direction == (
-                            -direction[0], -direction[1]):
-                        end_piece = self.board[end_row][end_col]
-                        if end_piece == "--":  # empty space is valid
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                        elif end_piece[0] == enemy_color:  # capture enemy piece
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                            break
-                        else:  # friendly piece
-                            break
-                else:  # off board
+        move = (row * 8 + col) | pieceCodes[self.board[row][col]] << 16  # start square and piece of every move
+        rays = raySquares[row][col]
+        for j in directions:
+            if piece_pinned:
+                direction = rayDirections[j]
+                if pin_direction != direction and pin_direction != (-direction[0], -direction[1]):
+                    continue
+            for end_row, end_col in rays[j]:  # the ray stops at the edge of the board
+                end_piece = self.board[end_row][end_col]
+                if end_piece == "--":  # empty space is valid
+                    moves.append(move | (end_row * 8 + end_col) << 6)
+                elif end_piece[0] == enemy_color:  # capture enemy piece
+                    moves.append(move | (end_row * 8 + end_col) << 6 | pieceCodes[end_piece] << 20)
+                    break
+                else:  # friendly piece
                     break
 
     def getKnightMoves(self, row, col, moves):
@@ -591,17 +999,14 @@ class GameState:
                 self.pins.remove(self.pins[i])
                 break
 
-        knight_moves = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2),
-                        (1, -2))  # up/left up/right right/up right/down down/left down/right left/up left/down
+        if piece_pinned:  # a pinned knight can never move
+            return
         ally_color = "w" if self.whiteToMove else "b"
-        for move in knight_moves:
-            end_row = row + move[0]
-            end_col = col + move[1]
-            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                if not piece_pinned:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece[0] != ally_color:  # so its either enemy piece or empty square
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
+        move = (row * 8 + col) | pieceCodes[self.board[row][col]] << 16  # start square and piece of every move
+        for end_row, end_col in knightSquares[row][col]:
+            end_piece = self.board[end_row][end_col]
+            if end_piece[0] != ally_color:  # so its either enemy piece or empty square
+                moves.append(move | (end_row * 8 + end_col) << 6 | pieceCodes[end_piece] << 20)
 
     def getBishopMoves(self, row, col, moves):
         """
@@ -616,59 +1021,29 @@ class GameState:
                 self.pins.remove(self.pins[i])
                 break
 
-        directions = ((-1, -1), (-1, 1), (1, 1), (1, -1))  # diagonals: up/left up/right down/right down/left
-        enemy_color = "b" if self.whiteToMove else "w"
-        for direction in directions:
-            for i in range(1, 8):
-                end_row = row + direction[0] * i
-                end_col = col + direction[1] * i
-                if 0 <= end_row <= 7 and 0 <= end_col <= 7:  # check if the move is on board
-                    if not piece_pinned or pin_direction == direction or pin_direction == (
-                            -direction[0], -direction[1]):
-                        end_piece = self.board[end_row][end_col]
-                        if end_piece == "--":  # empty space is valid
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                        elif end_piece[0] == enemy_color:  # capture enemy piece
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
-                            break
-                        else:  # friendly piece
-                            break
-                else:  # off board
-                    break
+        self.addSliderMoves(row, col, sliderDirections["B"], piece_pinned, pin_direction, moves)
 
     def getQueenMoves(self, row, col, moves):
         """
         Get all the queen moves for the queen located at row col and add the moves to the list.
         """
+        self.getRookMoves(row, col, moves)  # rook moves first, they leave a diagonal pin for the bishop moves to use
         self.getBishopMoves(row, col, moves)
-        self.getRookMoves(row, col, moves)
 
     def getKingMoves(self, row, col, moves):
         """
         Get all the king moves for the king located at row col and add the moves to the list.
         """
-        row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
-        col_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
-        ally_color = "w" if self.whiteToMove else "b"
-        for i in range(8):
-            end_row = row + row_moves[i]
-            end_col = col + col_moves[i]
-            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color:  # not an ally piece - empty or enemy
-                    # place king on end square and check for checks
-                    if ally_color == "w":
-                        self.whiteKingLocation = (end_row, end_col)
-                    else:
-                        self.black_king_location = (end_row, end_col)
-                    in_check, pins, checks = self.checkForPinsAndChecks()
-                    if not in_check:
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
-                    # place king back on original location
-                    if ally_color == "w":
-                        self.whiteKingLocation = (row, col)
-                    else:
-                        self.black_king_location = (row, col)
+        if self.whiteToMove:
+            ally_color, enemy_color = "w", "b"
+        else:
+            ally_color, enemy_color = "b", "w"
+        attacked = self.getAttackMap(enemy_color)  # one map answers all 8 destination squares
+        move = (row * 8 + col) | pieceCodes[self.board[row][col]] << 16  # start square and piece of every move
+        for end_row, end_col in kingSquares[row][col]:
+            end_piece = self.board[end_row][end_col]
+            if end_piece[0] != ally_color and (end_row, end_col) not in attacked:  # empty or enemy and not defended
+                moves.append(move | (end_row * 8 + end_col) << 6 | pieceCodes[end_piece] << 20)
 
     def getCastleMoves(self, row, col, moves):
         """
@@ -685,13 +1060,15 @@ class GameState:
 
     def getKingsideCastleMoves(self, row, col, moves):
         if self.board[row][col + 1] == '--' and self.board[row][col + 2] == '--':
-            if not self.squareUnderAttack(row, col + 1) and not self.squareUnderAttack(row, col + 2):
-                moves.append(Move((row, col), (row, col + 2), self.board, is_castle_move=True))
+            if not self.squaresUnderAttack(((row, col + 1), (row, col + 2))):
+                moves.append((row * 8 + col) | (row * 8 + col + 2) << 6 | MOVE_CASTLE |
+                             pieceCodes[self.board[row][col]] << 16)
 
     def getQueensideCastleMoves(self, row, col, moves):
         if self.board[row][col - 1] == '--' and self.board[row][col - 2] == '--' and self.board[row][col - 3] == '--':
-            if not self.squareUnderAttack(row, col - 1) and not self.squareUnderAttack(row, col - 2):
-                moves.append(Move((row, col), (row, col - 2), self.board, is_castle_move=True))
+            if not self.squaresUnderAttack(((row, col - 1), (row, col - 2))):
+                moves.append((row * 8 + col) | (row * 8 + col - 2) << 6 | MOVE_CASTLE |
+                             pieceCodes[self.board[row][col]] << 16)
 
 
 class CastleRights:
@@ -701,8 +1078,69 @@ class CastleRights:
         self.wqs = wqs
         self.bqs = bqs
 
+    def getIndex(self):
+        """
+        Pack the four rights into a number from 0 to 15.
+        """
+        return self.wks | self.wqs << 1 | self.bks << 2 | self.bqs << 3
+
+
+class MoveCache:
+    """
+    Bounded cache of legal move lists keyed by zobrist key, the least recently used entry is evicted when full.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __str__(self):
+        return "move cache: %d/%d entries, %d hits, %d misses, %d evictions" % (
+            len(self.entries), self.size, self.hits, self.misses, self.evictions)
+
+
+def readFens(lines, gameState=None):
+    """
+    Set up the position of every FEN or EPD line in an iterable of lines, such as an open file, and yield it.
+    The same GameState is reused for every line, so a caller that wants to keep a position has to copy it with toFen.
+    Blank lines and lines starting with # are skipped.
+    """
+    if gameState is None:
+        gameState = GameState()
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            gameState.setFen(line)
+            yield gameState
+
 
 class Move:
+    # a read-only view of a packed move, used for display and notation. the engine itself only passes packed moves around
+    __slots__ = ("code", "start_row", "start_col", "end_row", "end_col", "piece_moved", "piece_captured",
+                 "is_pawn_promotion", "promotion_piece", "is_enpassant_move", "is_castle_move", "is_capture", "moveID")
+
     # in chess, fields on the board are described by two symbols, one of them being number between 1-8 (which is corresponding to rows)
     # and the second one being a letter between a-f (corresponding to columns), in order to use this notation we need to map our [row][col] coordinates
     # to match the ones used in the original chess game
@@ -712,26 +1150,51 @@ class Move:
     files_to_cols = {"a": 0, "b": 1, "c": 2, "d": 3,
                      "e": 4, "f": 5, "g": 6, "h": 7}
     cols_to_files = {v: k for k, v in files_to_cols.items()}
-
-    def __init__(self, start_square, end_square, board, is_enpassant_move=False, is_castle_move=False):
-        self.start_row = start_square[0]
-        self.start_col = start_square[1]
-        self.end_row = end_square[0]
-        self.end_col = end_square[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
+    promotion_pieces = ("Q", "R", "B", "N")  # queen first, it is the one a click in the UI selects
+
+    def __init__(self, start_square, end_square, board, is_enpassant_move=False, is_castle_move=False,
+                 promotion_piece="Q"):
+        start_row, start_col = start_square
+        end_row, end_col = end_square
+        piece_moved = board[start_row][start_col]
+        piece_captured = board[end_row][end_col]
+        code = (start_row * 8 + start_col) | (end_row * 8 + end_col) << 6
         # pawn promotion
-        self.is_pawn_promotion = (self.piece_moved == "wp" and self.end_row == 0) or (
-                self.piece_moved == "bp" and self.end_row == 7)
+        if (piece_moved == "wp" and end_row == 0) or (piece_moved == "bp" and end_row == 7):
+            code |= MOVE_PROMOTION | self.promotion_pieces.index(promotion_piece) << 14
         # en passant
-        self.is_enpassant_move = is_enpassant_move
-        if self.is_enpassant_move:
-            self.piece_captured = "wp" if self.piece_moved == "bp" else "bp"
+        if is_enpassant_move:
+            code |= MOVE_ENPASSANT
+            piece_captured = "wp" if piece_moved == "bp" else "bp"
         # castle move
-        self.is_castle_move = is_castle_move
+        if is_castle_move:
+            code |= MOVE_CASTLE
+        self.unpack(code | pieceCodes[piece_moved] << 16 | pieceCodes[piece_captured] << 20)
 
+    @classmethod
+    def fromCode(cls, code):
+        """
+        Build a Move from a packed move.
+        """
+        move = cls.__new__(cls)
+        move.unpack(code)
+        return move
+
+    def unpack(self, code):
+        self.code = code
+        self.start_row, self.start_col = divmod(code & 63, 8)
+        self.end_row, self.end_col = divmod(code >> 6 & 63, 8)
+        self.piece_moved = pieceNames[code >> 16 & 15]
+        self.piece_captured = pieceNames[code >> 20 & 15]
+        kind = code & MOVE_KIND
+        self.is_pawn_promotion = kind == MOVE_PROMOTION
+        self.promotion_piece = self.promotion_pieces[code >> 14 & 3]
+        self.is_enpassant_move = kind == MOVE_ENPASSANT
+        self.is_castle_move = kind == MOVE_CASTLE
         self.is_capture = self.piece_captured != "--"
         self.moveID = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+        if self.is_pawn_promotion:  # under-promotions get their own IDs, the queen keeps the plain one
+            self.moveID += 10000 * (code >> 14 & 3)
 
     def __eq__(self, other):
         """
@@ -743,9 +1206,9 @@ class Move:
 
     def getChessNotation(self):
         if self.is_pawn_promotion:
-            return self.getRankFile(self.end_row, self.end_col) + "Q"
+            return self.getRankFile(self.end_row, self.end_col) + self.promotion_piece
         if self.is_castle_move:
-            if self.end_col == 1:
+            if self.end_col == 2:
                 return "0-0-0"
             else:
                 return "0-0"
@@ -764,11 +1227,20 @@ class Move:
             else:
                 return self.piece_moved[1] + self.getRankFile(self.end_row, self.end_col)
 
-        # TODO Disambiguating moves
+        # moves that need disambiguating are written in full by GameState.getSanNotation, which knows the position
 
     def getRankFile(self, row, col):
         return self.cols_to_files[col] + self.rows_to_ranks[row]
 
+    def getUciNotation(self):
+        """
+        Long algebraic notation such as e2e4 or e7e8q, as used by engines and perft tools.
+        """
+        notation = self.getRankFile(self.start_row, self.start_col) + self.getRankFile(self.end_row, self.end_col)
+        if self.is_pawn_promotion:
+            notation += self.promotion_piece.lower()
+        return notation
+
     def __str__(self):
         if self.is_castle_move:
             return "0-0" if self.end_col == 6 else "0-0-0"
@@ -779,236 +1251,9 @@ class Move:
             if self.is_capture:
                 return self.cols_to_files[self.start_col] + "x" + end_square
             else:
-                return end_square + "Q" if self.is_pawn_promotion else end_square
+                return end_square + self.promotion_piece if self.is_pawn_promotion else end_square
 
         move_string = self.piece_moved[1]
         if self.is_capture:
             move_string += "x"
         return move_string + end_square
-
-# create display window
-
-screenWidth = 800
-screenHeight = 600
-
-icon = pygame.image.load("icons/chessIcon.jpg")
-pygame.display.set_icon(icon)
-
-screen = pygame.display.set_mode((screenWidth, screenHeight))
-pygame.display.set_caption("")
-
-# menu state
-
-menuState = "main" 
-
-# define fonts
-
-titleFont = pygame.font.Font("fonts/titleFont.ttf", 70)
-buttonFont = pygame.font.Font("fonts/buttonFont.ttf", 22)
-
-# define colours
-
-textColour = (255, 255, 255)
-
-# import sounds/music
-
-buttonSound = pygame.mixer.Sound("sounds/buttonPressSound.mp3")
-linkSound = pygame.mixer.Sound("sounds/linkButtonSound.mp3")
-
-pygame.mixer.music.load("music/mainMusic.mp3")
-pygame.mixer.music.play(-1)
-
-# display text on screen
-
-def blitText(surface, text, pos, font, colour=pygame.Color("black")):
-
-    words = [word.split(' ') for word in text.splitlines()]  # 2D array where each row is a list of words
-    space = font.size(' ')[0]  # the width of a space
-    maxWidth, maxHeight = surface.get_size()
-    x, y = pos
-
-    for line in words:
-        for word in line:
-            wordSurface = font.render(word, 0, colour)
-            wordWidth, wordHeight = wordSurface.get_size()
-            if x + wordWidth >= maxWidth: 
-                x = pos[0]  # reset the x
-                y += wordHeight  # start on a new row
-            surface.blit(wordSurface, (x, y))
-            x += wordWidth + space
-        x = pos[0]  # reset the x again
-        y += wordHeight  # start on a new row again
-
-
-information = ("Chess is a game played between two opponents on opposite sides of a board containing\n"\
-                    "64 squares of alternating colours; black and white. Each player has 16 pieces: 1 king,\n1 queen, 2 rooks, "\
-                    "2 bishops, 2 knights, and 8 pawns. The goal of the game is to \ncheckmate the other king. "\
-                    "To help you understand how each of the pieces move, the\nrules, and how to win, I have "\
-                    "included some links to sources of information that I found helpful as a beginner. Good luck, have fun playing, and "\
-                    "enjoy your chess journey!")
-
-# game title
-
-title = titleFont.render("Chess.exe", True, "white")
-titleRect = title.get_rect()
-titleRect.center = (screenWidth/2, 100)
-
-# button class
-
-class Button():
-
-    def __init__(self, image, xPos, yPos, text_input):
-
-        self.image = image
-        self.x = xPos 
-        self.y = yPos
-        self.rect = self.image.get_rect(center=(self.x, self.y))
-        self.text_input = text_input
-        self.text = buttonFont.render(self.text_input, True, "white")
-        self.text_rect = self.text.get_rect(center=(self.x, self.y))
-
-    def update(self):
-
-        screen.blit(self.image, self.rect)
-        screen.blit(self.text, self.text_rect)
-
-    def checkForInput(self, position):
-
-        action = False
-        pos = pygame.mouse.get_pos() 
-
-        if self.rect.collidepoint(pos):
-            print("pressed") # to ensure that all buttons, regardless of functionallity respond to input
-            action = True
-        return action
-
-# load button images/images and buttons
-
-playButton = pygame.image.load("buttons/playButton.png")
-playButton = Button(playButton, 400, 300, "")
-
-optionsMenuButton = pygame.image.load("buttons/optionsMenuButton.png")
-optionsMenuButton = Button(optionsMenuButton, 400, 370, "")
-
-helpButton = pygame.image.load("buttons/helpButton.png")
-helpButton = Button(helpButton, 400, 440, "")
-
-mainMenuButton = pygame.image.load("buttons/mainMenuButton.png")
-mainMenuButton = Button(mainMenuButton, 400, 520, "")
-
-helpMenuBackground = pygame.image.load("backgrounds/helpMenuBackground.jpg")
-helpMenuBackground = pygame.transform.scale(helpMenuBackground, (screenWidth, screenHeight))
-
-mainMenuBackGround = pygame.image.load("backgrounds/mainMenuBackground.jpg")
-mainMenuBackground = pygame.transform.scale(mainMenuBackGround, (screenWidth, screenHeight))
-
-optionsMenuBackground = pygame.image.load("backgrounds/optionsMenuBackground.jpg")
-optionsMenuBackground = pygame.transform.scale(optionsMenuBackground, (screenWidth, screenHeight))
-
-# main game loop
-
-run = True
-while run:
-
-    if menuState == "main":
-
-        #display background
-
-        screen.blit(mainMenuBackground, (0, 0))
-        screen.blit(title, titleRect)
-
-        # event handler
-
-        for event in pygame.event.get():
-
-            if event.type == pygame.QUIT:   
-                run = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if playButton.checkForInput(pygame.mouse.get_pos()):
-                    menuState = "play"
-                    buttonSound.play()
-                if optionsMenuButton.checkForInput(pygame.mouse.get_pos()):
-                    menuState = "options"
-                    buttonSound.play()
-                if helpButton.checkForInput(pygame.mouse.get_pos()):
-                    menuState = "help"
-                    buttonSound.play()
-
-        playButton.update()
-        optionsMenuButton.update()
-        helpButton.update()
-        
-    elif menuState == "options":
-
-        screen.blit(optionsMenuBackground, (0, 0))
-            
-        # event handler
-        
-        for event in pygame.event.get():
-
-            if event.type == pygame.QUIT:
-                run = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if mainMenuButton.checkForInput(pygame.mouse.get_pos()):
-                    menuState = "main"
-                    buttonSound.play()
-        
-        mainMenuButton.update()
-
-    elif menuState == "help":
-    
-        screen.blit(helpMenuBackground, (0, 0))
-        blitText(screen, information, (20, 40), buttonFont)
-
-        # links
-
-        howToPlayChessLink = screen.blit(buttonFont.render("• How To Play Chess | Chess.com", True, "navy blue"), (20, 240))
-        howToMoveThePiecesLink = screen.blit(buttonFont.render("• How To Move The Pieces | Chess.com", True, "navy blue"), (20, 270))
-        beginnersGuideToChess = screen.blit(buttonFont.render("• Beginners Guide To Chess | Lichess", True, "navy blue"), (20, 300))
-        saintLouisChessClub = screen.blit(buttonFont.render("• Saint louis Chess Club | Youtube", True, "navy blue"), (20, 330))
-        chessManiac = screen.blit(buttonFont.render("• Free Chess Ebooks | Chess Maniac", True, "navy blue"), (20, 360))
-        redditChess = screen.blit(buttonFont.render("• r/chess | Reddit", True, "navy blue"), (20, 390))
-        theWeekInChess = screen.blit(buttonFont.render("• Daily Chess News & Games| The Week in Chess", True, "navy blue"), (20, 420))
-        
-        for event in pygame.event.get():
-            
-            if event.type == pygame.QUIT:
-                run = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if mainMenuButton.checkForInput(pygame.mouse.get_pos()):
-                    menuState = "main"
-                    buttonSound.play()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = event.pos
-                if howToPlayChessLink.collidepoint(pos):
-                    webbrowser.open(r"https://www.chess.com/article/view/how-to-play-chess")
-                    linkSound.play()
-                if howToMoveThePiecesLink.collidepoint(pos):
-                    webbrowser.open(r"https://www.chess.com/article/view/how-to-move-the-pieces")
-                    linkSound.play()
-                if beginnersGuideToChess.collidepoint(pos):
-                    webbrowser.open(r"https://lichess.org/study/oFHnjHO0/J1ez3o9R")
-                    linkSound.play()
-                if saintLouisChessClub.collidepoint(pos):
-                    webbrowser.open(r"https://www.youtube.com/channel/UCM-ONC2bCHytG2mYtKDmIeA")
-                    linkSound.play()
-                if chessManiac.collidepoint(pos):
-                    webbrowser.open(r"https://www.chessmaniac.com/chess_ebooks/")
-                    linkSound.play()
-                if redditChess.collidepoint(pos):
-                    webbrowser.open(r"https://www.reddit.com/r/chess/")
-                    linkSound.play()
-                if theWeekInChess.collidepoint(pos):
-                    webbrowser.open(r"https://theweekinchess.com/live")
-                    linkSound.play()
-            
-        mainMenuButton.update()
-
-    elif menuState == "play":
-        pygame.mixer.music.fadeout(3000)
-        main()
-        
-        
-    pygame.display.update()
-    
-pygame.quit()
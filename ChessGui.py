@@ -0,0 +1,537 @@
+import argparse
+import time
+import pygame
+import webbrowser
+
+from Assets import AssetManager
+from ChessGame import GameState, Move, MoveCache
+from Pgn import writeGame
+from SearchWorker import SearchWorker
+
+# the pygame front end: the menu and the board, with the AI playing through SearchWorker. run it with python ChessGui.py
+# nothing is loaded or opened until runMenu is called, importing this module only imports pygame
+# images, fonts and sounds come from the asset manager, which loads each of them the first time it is needed
+
+boardWidth = boardHeight = 600
+boardDimension = 8
+squareSize = boardHeight // boardDimension
+chessPieces = {}
+playerOne = True  # True when white is played by a human, False when the AI plays it
+playerTwo = False  # the same for black
+aiTimeLimit = 2.0  # seconds the AI thinks per move
+ponder = True  # let the AI think about its next move during the human's turn
+bookPath = "book.bin"  # opening book built with OpeningBook.py, the AI plays from it when the file exists
+bitbasePath = "bitbases"  # endgame bitbases generated with Bitbases.py, used when the directory exists
+gamesPath = "games.pgn"  # games saved with the 's' key are added to the end of this file
+frameRate = 30  # most frames drawn per second, the loops sleep for the rest of the time
+dirtyRectangles = True  # only draw the squares that changed, False draws the whole board every frame
+lastMoveColour = (10, 255, 255)
+selectedColour = (175, 225, 175)
+moveTargetColour = (255, 255, 0)
+highlightAlpha = 100  # transparency of the highlights (0 is transparent, 255 opaque)
+exposeEvents = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)  # the window was uncovered and has to be drawn again
+assets = AssetManager()
+importTime = time.perf_counter()  # start of the startup timing report
+
+pieces = ['wp', 'wR', 'wN', 'wB', 'wK', 'wQ', 'bp', 'bR', 'bN', 'bB', 'bK', 'bQ']
+
+# fill the global directory of piece images, only the first call loads and scales them, later ones come from the cache
+def loadImages():
+
+    for piece in pieces:
+        chessPieces[piece] = assets.image("pieces/" + piece + ".png", (squareSize, squareSize), alpha=True)
+
+# main game function/handling user input
+def main():
+    
+    pygame.init()
+    screen = pygame.display.set_mode((600, 600))
+    gameState = GameState(MoveCache())  # the same positions are looked at every frame and again after an undo
+    validMoves = gameState.getValidMoves()
+    isMoveMade = False  # flag variable for when a move is made, keep track to generate new valid moves
+    loadImages()  # do this only once before while loop
+    running = True
+    selectedSquare = ()  # no square is selected initially, this will keep track of the last click of the user 
+    playerClicks = []  # this will keep track of player clicks 
+    gameOver = False
+    searchWorker = SearchWorker(aiTimeLimit, bookPath=bookPath, bitbasePath=bitbasePath)  # the AI searches on a background thread so the window stays responsive
+    aiSearchId = None  # id of the search for the AI's move while it is thinking
+    renderer = BoardRenderer(screen)
+    clock = pygame.time.Clock()
+
+    while running:
+        humanTurn = (gameState.whiteToMove and playerOne) or (not gameState.whiteToMove and playerTwo)
+ 
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                searchWorker.close()
+                pygame.quit()
+            elif event.type in exposeEvents:
+                renderer.invalidate()
+            # mouse handler, get the position of the selected square
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if not gameOver and humanTurn:
+                    location = pygame.mouse.get_pos()  # (x, y) location of the mouse
+                    column = location[0] // squareSize
+                    row = location[1] // squareSize
+                    if selectedSquare == (row, column) or column >= 8:  # user clicked the same square twice
+                        selectedSquare = ()  # deselect
+                        playerClicks = []  # clear clicks
+                    # store the selected square
+                    else:
+                        selectedSquare = (row, column)
+                        playerClicks.append(selectedSquare)  
+                    # make the move
+                    if len(playerClicks) == 2:  # after 2nd click
+                        move = Move(playerClicks[0], playerClicks[1], gameState.board)
+                        for i in range(len(validMoves)):
+                            if move == Move.fromCode(validMoves[i]):  # promotions from a click always match the queen promotion
+                                gameState.makeMove(validMoves[i])
+                                isMoveMade = True
+                                selectedSquare = ()  # reset user clicks
+                                playerClicks = []
+                                break
+                        if not isMoveMade:
+                            playerClicks = [selectedSquare]
+            # key handler
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_z:  # undo when 'z' is pressed
+                    searchWorker.cancel()  # whatever the AI was thinking about is no longer on the board
+                    aiSearchId = None
+                    gameState.undoMove()
+                    isMoveMade = True
+                    gameOver = False
+                if event.key == pygame.K_s:  # save the game so far as PGN when 's' is pressed
+                    saveGame(gameState)
+                if event.key == pygame.K_r:  # reset the game when 'r' is pressed, add a way back to the menu straight from the gave over screen after patching the AI
+                    searchWorker.cancel()
+                    aiSearchId = None
+                    gameState = GameState(gameState.moveCache)  # positions from the last game are still valid
+                    validMoves = gameState.getValidMoves()
+                    selectedSquare = ()
+                    playerClicks = []
+                    isMoveMade = False
+                    gameOver = False
+                
+        # AI move finder, the result is picked up on a later frame once the worker has finished
+        if not gameOver and not humanTurn and not isMoveMade:
+            if aiSearchId is None:
+                aiSearchId = searchWorker.startSearch(gameState.moveLog)
+            else:
+                result = searchWorker.getResult(aiSearchId)
+                if result is not None:
+                    aiSearchId = None
+                    if result.bestMove is not None:
+                        gameState.makeMove(result.bestMove)
+                        isMoveMade = True
+                        if ponder and ((gameState.whiteToMove and playerOne) or (not gameState.whiteToMove and playerTwo)):
+                            searchWorker.startSearch(gameState.moveLog, ponder=True)
+
+        if isMoveMade:
+            # generate a new set of valid moves
+            validMoves = gameState.getValidMoves()
+            isMoveMade = False
+
+        endText = None
+        if gameState.checkmate:
+            gameOver = True
+            endText = "Black wins by checkmate" if gameState.whiteToMove else "White wins by checkmate"
+        elif gameState.stalemate:
+            gameOver = True
+            endText = "Stalemate"
+
+        # only the squares that changed are sent to the display, a frame where nothing changed sends nothing
+        dirty = renderer.draw(gameState, validMoves, selectedSquare, endText, full=not dirtyRectangles)
+        if dirty:
+            pygame.display.update(dirty)
+        clock.tick(frameRate)
+
+
+# add the game played so far to the end of gamesPath as PGN
+def saveGame(gameState):
+
+    if gameState.checkmate:
+        result = "0-1" if gameState.whiteToMove else "1-0"
+    elif gameState.stalemate:
+        result = "1/2-1/2"
+    else:
+        result = "*"  # still being played
+    tags = {"Event": "Chess.exe game", "Date": time.strftime("%Y.%m.%d"),
+            "White": "Human" if playerOne else "chessAI", "Black": "Human" if playerTwo else "chessAI"}
+    with open(gamesPath, "a") as pgnFile:
+        writeGame(pgnFile, tags, GameState(), gameState.moveLog, result)
+
+
+class BoardRenderer():
+    """
+    Draws the board screen. The empty board is drawn once, and the piece and highlights every square showed in the
+    last frame are kept, so a frame only draws the squares that a move, an undo or a new selection changed.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.board = pygame.Surface((boardWidth, boardHeight)).convert()
+        drawBoard(self.board)
+        self.highlights = {}  # colour -> transparent square of that colour
+        self.shown = {}  # (row, column) -> (piece, highlight colours) on the screen
+        self.endText = None
+
+    def invalidate(self):
+        """
+        Forget what is on the screen, so the next frame draws every square.
+        """
+        self.shown = {}
+
+    def highlight(self, colour):
+        surface = self.highlights.get(colour)
+        if surface is None:
+            surface = self.highlights[colour] = pygame.Surface((squareSize, squareSize)).convert()
+            surface.set_alpha(highlightAlpha)
+            surface.fill(colour)
+        return surface
+
+    def draw(self, gameState, validMoves, selectedSquare, endText=None, full=False):
+        """
+        Bring the screen up to date, returns the rectangles that were drawn. full draws every square.
+        """
+        if full or endText != self.endText:
+            self.invalidate()
+        highlights = squareHighlights(gameState, validMoves, selectedSquare)
+        dirty = []
+        for row in range(boardDimension):
+            for column in range(boardDimension):
+                piece = gameState.board[row][column]
+                state = (piece, highlights.get((row, column), ()))
+                if self.shown.get((row, column)) == state:
+                    continue
+                self.shown[(row, column)] = state
+                rect = pygame.Rect(column * squareSize, row * squareSize, squareSize, squareSize)
+                self.screen.blit(self.board, rect, rect)
+                if piece != "--":
+                    self.screen.blit(chessPieces[piece], rect)
+                for colour in state[1]:
+                    self.screen.blit(self.highlight(colour), rect)
+                dirty.append(rect)
+        if endText is not None and dirty:  # squares drawn under the text would cover it
+            dirty.append(drawEndGameText(self.screen, endText))
+        self.endText = endText
+        return dirty
+
+
+# the highlight colours of every highlighted square, drawn in order over the piece
+def squareHighlights(gameState, validMoves, selectedSquare):
+
+    highlights = {}
+    if (len(gameState.moveLog)) > 0:
+        lastMove = Move.fromCode(gameState.moveLog[-1])
+        highlights[(lastMove.end_row, lastMove.end_col)] = (lastMoveColour,)
+    if selectedSquare != ():
+        row = selectedSquare[0]
+        column = selectedSquare[1]
+        if gameState.board[row][column][0] == ('w' if gameState.whiteToMove else 'b'):
+            # highlight selected square
+            highlights[selectedSquare] = highlights.get(selectedSquare, ()) + (selectedColour,)
+            # highlight moves from that square
+            for move in validMoves:
+                if move & 63 == row * 8 + column:  # the start square of a packed move
+                    end = divmod(move >> 6 & 63, 8)
+                    highlights[end] = highlights.get(end, ()) + (moveTargetColour,)
+    return highlights
+
+# draw the board
+def drawBoard(screen):
+ 
+    global colors
+    colors = [pygame.Color("white"), pygame.Color(222,184,135)]
+    for row in range(boardDimension):
+        for column in range(boardDimension):
+            color = colors[((row + column) % 2)]
+            pygame.draw.rect(screen, color, pygame.Rect(column * squareSize, row * squareSize, squareSize, squareSize))
+
+# displaying game result when the game is over, returns the rectangle the text covers
+def drawEndGameText(screen, text):
+    checkmate = buttonFont.render(text, False, pygame.Color("grey"))
+    textLocation = pygame.Rect(0, 0, boardWidth, boardHeight).move(boardWidth/2 - checkmate.get_width()/2, boardHeight/2 - checkmate.get_height()/2)
+    screen.blit(checkmate, textLocation)
+    stalemate = buttonFont.render(text, False, pygame.Color('black'))
+    screen.blit(stalemate, textLocation.move(2, 2))
+    return pygame.Rect(textLocation.topleft, (checkmate.get_width() + 2, checkmate.get_height() + 2))
+
+screenWidth = 800
+screenHeight = 600
+
+# the menu window and its fonts, created by runMenu
+screen = None
+titleFont = None
+buttonFont = None
+
+# define colours
+
+textColour = (255, 255, 255)
+
+# display text on screen
+
+def blitText(surface, text, pos, font, colour=pygame.Color("black")):
+
+    words = [word.split(' ') for word in text.splitlines()]  # 2D array where each row is a list of words
+    space = font.size(' ')[0]  # the width of a space
+    maxWidth, maxHeight = surface.get_size()
+    x, y = pos
+
+    for line in words:
+        for word in line:
+            wordSurface = font.render(word, 0, colour)
+            wordWidth, wordHeight = wordSurface.get_size()
+            if x + wordWidth >= maxWidth: 
+                x = pos[0]  # reset the x
+                y += wordHeight  # start on a new row
+            surface.blit(wordSurface, (x, y))
+            x += wordWidth + space
+        x = pos[0]  # reset the x again
+        y += wordHeight  # start on a new row again
+
+
+information = ("Chess is a game played between two opponents on opposite sides of a board containing\n"\
+                    "64 squares of alternating colours; black and white. Each player has 16 pieces: 1 king,\n1 queen, 2 rooks, "\
+                    "2 bishops, 2 knights, and 8 pawns. The goal of the game is to \ncheckmate the other king. "\
+                    "To help you understand how each of the pieces move, the\nrules, and how to win, I have "\
+                    "included some links to sources of information that I found helpful as a beginner. Good luck, have fun playing, and "\
+                    "enjoy your chess journey!")
+
+# button class
+
+class Button():
+
+    def __init__(self, imagePath, xPos, yPos, text_input):
+
+        self.imagePath = imagePath  # the image is loaded when the button is first drawn or clicked
+        self.x = xPos 
+        self.y = yPos
+        self.text_input = text_input
+        self.text = buttonFont.render(self.text_input, True, "white")
+        self.text_rect = self.text.get_rect(center=(self.x, self.y))
+
+    @property
+    def image(self):
+        return assets.image(self.imagePath, alpha=True)
+
+    @property
+    def rect(self):
+        return self.image.get_rect(center=(self.x, self.y))
+
+    def update(self):
+
+        screen.blit(self.image, self.rect)
+        screen.blit(self.text, self.text_rect)
+
+    def checkForInput(self, position):
+
+        action = False
+        pos = pygame.mouse.get_pos() 
+
+        if self.rect.collidepoint(pos):
+            action = True
+        return action
+
+
+def runMenu(timing=False, preload=True):
+
+    global screen, titleFont, buttonFont  # used by Button and drawEndGameText
+    phases = []  # (startup step, seconds) for the timing report
+    phase_start = importTime
+
+    def endPhase(name):
+        nonlocal phase_start
+        now = time.perf_counter()
+        phases.append((name, now - phase_start))
+        phase_start = now
+
+    endPhase("import")
+    pygame.init()
+    endPhase("pygame.init")
+
+    # create display window
+
+    pygame.display.set_icon(assets.image("icons/chessIcon.jpg"))
+
+    screen = pygame.display.set_mode((screenWidth, screenHeight))
+    pygame.display.set_caption("")
+    endPhase("display")
+
+    # menu state
+
+    menuState = "main" 
+
+    # define fonts
+
+    titleFont = assets.font("fonts/titleFont.ttf", 70)
+    buttonFont = assets.font("fonts/buttonFont.ttf", 22)
+    endPhase("fonts")
+
+    # sounds are loaded the first time they are played, the music is streamed
+
+    buttonSound = "sounds/buttonPressSound.mp3"
+    linkSound = "sounds/linkButtonSound.mp3"
+
+    pygame.mixer.music.load("music/mainMusic.mp3")
+    pygame.mixer.music.play(-1)
+    endPhase("music")
+
+    # game title
+
+    title = titleFont.render("Chess.exe", True, "white")
+    titleRect = title.get_rect()
+    titleRect.center = (screenWidth/2, 100)
+
+    # buttons, their images are loaded when they are first drawn
+
+    playButton = Button("buttons/playButton.png", 400, 300, "")
+    optionsMenuButton = Button("buttons/optionsMenuButton.png", 400, 370, "")
+    helpButton = Button("buttons/helpButton.png", 400, 440, "")
+    mainMenuButton = Button("buttons/mainMenuButton.png", 400, 520, "")
+
+    # backgrounds are scaled to the window when they are first shown
+
+    helpMenuBackground = "backgrounds/helpMenuBackground.jpg"
+    mainMenuBackground = "backgrounds/mainMenuBackground.jpg"
+    optionsMenuBackground = "backgrounds/optionsMenuBackground.jpg"
+    screenSize = (screenWidth, screenHeight)
+
+    # main game loop
+
+    # the menus are still pictures, a menu is only drawn when it is opened or the window needs repainting
+
+    clock = pygame.time.Clock()
+    shownState = None  # menu on the screen
+    firstFrame = True
+    run = True
+    while run:
+
+        redraw = menuState != shownState or pygame.event.peek(exposeEvents)
+        shownState = menuState
+
+        if menuState == "main":
+
+            #display background
+
+            if redraw:
+                screen.blit(assets.image(mainMenuBackground, screenSize), (0, 0))
+                screen.blit(title, titleRect)
+                playButton.update()
+                optionsMenuButton.update()
+                helpButton.update()
+
+            # event handler
+
+            for event in pygame.event.get():
+
+                if event.type == pygame.QUIT:   
+                    run = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if playButton.checkForInput(pygame.mouse.get_pos()):
+                        menuState = "play"
+                        assets.sound(buttonSound).play()
+                    if optionsMenuButton.checkForInput(pygame.mouse.get_pos()):
+                        menuState = "options"
+                        assets.sound(buttonSound).play()
+                    if helpButton.checkForInput(pygame.mouse.get_pos()):
+                        menuState = "help"
+                        assets.sound(buttonSound).play()
+
+        elif menuState == "options":
+
+            if redraw:
+                screen.blit(assets.image(optionsMenuBackground, screenSize), (0, 0))
+                mainMenuButton.update()
+
+            # event handler
+
+            for event in pygame.event.get():
+
+                if event.type == pygame.QUIT:
+                    run = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if mainMenuButton.checkForInput(pygame.mouse.get_pos()):
+                        menuState = "main"
+                        assets.sound(buttonSound).play()
+
+        elif menuState == "help":
+
+            if redraw:
+                screen.blit(assets.image(helpMenuBackground, screenSize), (0, 0))
+                blitText(screen, information, (20, 40), buttonFont)
+
+                # links
+
+                howToPlayChessLink = screen.blit(buttonFont.render("• How To Play Chess | Chess.com", True, "navy blue"), (20, 240))
+                howToMoveThePiecesLink = screen.blit(buttonFont.render("• How To Move The Pieces | Chess.com", True, "navy blue"), (20, 270))
+                beginnersGuideToChess = screen.blit(buttonFont.render("• Beginners Guide To Chess | Lichess", True, "navy blue"), (20, 300))
+                saintLouisChessClub = screen.blit(buttonFont.render("• Saint louis Chess Club | Youtube", True, "navy blue"), (20, 330))
+                chessManiac = screen.blit(buttonFont.render("• Free Chess Ebooks | Chess Maniac", True, "navy blue"), (20, 360))
+                redditChess = screen.blit(buttonFont.render("• r/chess | Reddit", True, "navy blue"), (20, 390))
+                theWeekInChess = screen.blit(buttonFont.render("• Daily Chess News & Games| The Week in Chess", True, "navy blue"), (20, 420))
+                mainMenuButton.update()
+
+            for event in pygame.event.get():
+
+                if event.type == pygame.QUIT:
+                    run = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if mainMenuButton.checkForInput(pygame.mouse.get_pos()):
+                        menuState = "main"
+                        assets.sound(buttonSound).play()
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    pos = event.pos
+                    if howToPlayChessLink.collidepoint(pos):
+                        webbrowser.open(r"https://www.chess.com/article/view/how-to-play-chess")
+                        assets.sound(linkSound).play()
+                    if howToMoveThePiecesLink.collidepoint(pos):
+                        webbrowser.open(r"https://www.chess.com/article/view/how-to-move-the-pieces")
+                        assets.sound(linkSound).play()
+                    if beginnersGuideToChess.collidepoint(pos):
+                        webbrowser.open(r"https://lichess.org/study/oFHnjHO0/J1ez3o9R")
+                        assets.sound(linkSound).play()
+                    if saintLouisChessClub.collidepoint(pos):
+                        webbrowser.open(r"https://www.youtube.com/channel/UCM-ONC2bCHytG2mYtKDmIeA")
+                        assets.sound(linkSound).play()
+                    if chessManiac.collidepoint(pos):
+                        webbrowser.open(r"https://www.chessmaniac.com/chess_ebooks/")
+                        assets.sound(linkSound).play()
+                    if redditChess.collidepoint(pos):
+                        webbrowser.open(r"https://www.reddit.com/r/chess/")
+                        assets.sound(linkSound).play()
+                    if theWeekInChess.collidepoint(pos):
+                        webbrowser.open(r"https://theweekinchess.com/live")
+                        assets.sound(linkSound).play()
+
+        elif menuState == "play":
+            pygame.mixer.music.fadeout(3000)
+            main()
+
+
+        if redraw:
+            pygame.display.update()
+        clock.tick(frameRate)
+
+        if firstFrame:
+            firstFrame = False
+            endPhase("first frame")
+            if preload:  # decode what the other menus and the board need while the main menu is on screen
+                assets.preload([helpMenuBackground, optionsMenuBackground, mainMenuButton.imagePath] +
+                               ["pieces/" + piece + ".png" for piece in pieces])
+            if timing:
+                print("startup took %.1f ms" % (sum(seconds for name, seconds in phases) * 1000))
+                for name, seconds in phases:
+                    print("%8.1f ms  %s" % (seconds * 1000, name))
+
+    if timing:
+        print(assets.report())
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play chess against the engine.")
+    parser.add_argument("--timing", action="store_true", help="print how long startup and every asset load took")
+    parser.add_argument("--no-preload", action="store_true", help="load every asset when it is first used")
+    args = parser.parse_args()
+    runMenu(args.timing, not args.no_preload)
@@ -0,0 +1,103 @@
+# material and piece-square tables for the evaluation, tapered between middlegame and endgame
+# GameState keeps the sums of these tables up to date in makeMove and undoMove, so evaluating a position is O(1)
+# the square tables are written from white's side with square 0 = a8, the same as GameState.board,
+# black uses the vertically mirrored square
+
+pieceValues = {"p": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+endgamePieceValues = {"p": 120, "N": 300, "B": 320, "R": 520, "Q": 920, "K": 0}
+
+# game phase: 24 with all pieces on the board, 0 with only kings and pawns left
+phaseWeights = {"p": 0, "N": 1, "B": 1, "R": 2, "Q": 4, "K": 0}
+PHASE_TOTAL = 24
+
+pawnTable = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0)
+pawnEndgameTable = (  # passed pawns matter more as the board empties
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    15, 15, 15, 15, 15, 15, 15, 15,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0)
+knightTable = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50)
+bishopTable = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20)
+rookTable = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0)
+queenTable = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20)
+kingTable = (  # stay castled behind the pawns while there is material to attack with
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20)
+kingEndgameTable = (  # then come to the centre
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50)
+
+squareTables = {"p": pawnTable, "N": knightTable, "B": bishopTable, "R": rookTable, "Q": queenTable, "K": kingTable}
+endgameSquareTables = {"p": pawnEndgameTable, "N": knightTable, "B": bishopTable, "R": rookTable, "Q": queenTable,
+                       "K": kingEndgameTable}
+
+
+def buildScoreTables(values, tables):
+    """
+    Score of every piece name on every square including its material, from white's point of view.
+    """
+    scores = {}
+    for piece_type, table in tables.items():
+        scores["w" + piece_type] = [values[piece_type] + table[sq] for sq in range(64)]
+        scores["b" + piece_type] = [-values[piece_type] - table[sq ^ 56] for sq in range(64)]  # sq ^ 56 flips the row
+    return scores
+
+
+mgTables = buildScoreTables(pieceValues, squareTables)
+egTables = buildScoreTables(endgamePieceValues, endgameSquareTables)
@@ -0,0 +1,393 @@
+from array import array
+
+from Bitboard import BISHOP, BKS, BLACK, BQS, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE, WKS, WQS, castleMask
+from ChessGame import CastleRights, MOVE_CASTLE, MOVE_ENPASSANT, MOVE_KIND, MOVE_PROMOTION, Move, pieceCodes, \
+    pieceNames
+
+# alternative position core for GameState, built on a flat 10x12 mailbox of integer piece codes
+# the 8x8 board sits in the middle of an array 10 squares wide and 12 high, surrounded by sentinel squares,
+# two sentinel rows above and below so even a knight jump from the edge lands on a sentinel: no bounds tests needed
+# pieces use the same codes as packed moves, and packed moves keep the 0-63 squares of GameState
+
+OFFBOARD = -1
+EMPTY = 0
+
+# toMailbox[sq] is the mailbox index of square sq (row * 8 + col), fromMailbox maps back and holds -1 off the board
+toMailbox = [21 + row * 10 + col for row in range(8) for col in range(8)]
+fromMailbox = [-1] * 120
+for sq, index in enumerate(toMailbox):
+    fromMailbox[index] = sq
+
+# directions 0-3 are orthogonal, 4-7 are diagonal, same order as GameState.checkForPinsAndChecks
+rayOffsets = (-10, -1, 10, 1, -11, -9, 9, 11)
+knightOffsets = (-21, -19, -8, 12, 19, 21, -12, 8)
+
+
+def mailboxFromBoard(board):
+    """
+    Flat 10x12 array of piece codes for GameState's 8x8 grid of piece names.
+    """
+    squares = array("b", [OFFBOARD] * 120)
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        squares[toMailbox[sq]] = pieceCodes[board[row][col]]
+    return squares
+
+
+def boardFromMailbox(squares):
+    """
+    GameState's 8x8 grid of piece names for a flat 10x12 array, for drawPieces and Move.
+    """
+    return [[pieceNames[squares[toMailbox[row * 8 + col]]] for col in range(8)] for row in range(8)]
+
+
+class MailboxGameState:
+    """
+    Drop-in alternative to GameState: getValidMoves, makeMove and undoMove behave the same and use the same
+    packed moves, but the position is kept as integer piece codes in a flat array('b') with sentinel squares.
+    """
+
+    def __init__(self, board=None, whiteToMove=True, castlingRights=None, enpassantPossible=()):
+        if board is None:
+            board = [
+                ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+                ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["--", "--", "--", "--", "--", "--", "--", "--"],
+                ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
+                ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
+        if castlingRights is None:
+            castlingRights = CastleRights(True, True, True, True)
+        self.squares = mailboxFromBoard(board)
+        self.kings = {WHITE: self.squares.index(WHITE + KING), BLACK: self.squares.index(BLACK + KING)}
+        self.whiteToMove = whiteToMove
+        self.moveLog = []
+        self.checkmate = False
+        self.stalemate = False
+        self.inCheck = False
+        self.enpassantPossible = enpassantPossible
+        self.enpassantPossibleLog = [self.enpassantPossible]
+        self.castlingBits = (WKS if castlingRights.wks else 0) | (WQS if castlingRights.wqs else 0) | \
+                            (BKS if castlingRights.bks else 0) | (BQS if castlingRights.bqs else 0)
+        self.castlingBitsLog = [self.castlingBits]
+
+    @classmethod
+    def fromGameState(cls, gameState):
+        """
+        Build a mailbox position from the current position of a GameState.
+        """
+        rights = gameState.currentCastlingRights
+        return cls(gameState.board, gameState.whiteToMove, CastleRights(rights.wks, rights.bks, rights.wqs, rights.bqs),
+                   gameState.enpassantPossible)
+
+    @property
+    def board(self):
+        """
+        The position as GameState's 8x8 grid of piece names, for drawPieces and Move.
+        """
+        return boardFromMailbox(self.squares)
+
+    @property
+    def whiteKingLocation(self):
+        return divmod(fromMailbox[self.kings[WHITE]], 8)
+
+    @property
+    def black_king_location(self):
+        return divmod(fromMailbox[self.kings[BLACK]], 8)
+
+    @property
+    def currentCastlingRights(self):
+        bits = self.castlingBits
+        return CastleRights(bool(bits & WKS), bool(bits & BKS), bool(bits & WQS), bool(bits & BQS))
+
+    def makeMove(self, move):
+        squares = self.squares
+        start_sq = move & 63
+        end_sq = move >> 6 & 63
+        start = toMailbox[start_sq]
+        end = toMailbox[end_sq]
+        kind = move & MOVE_KIND
+        moved = move >> 16 & 15
+        squares[start] = EMPTY
+        squares[end] = moved
+
+        if kind == MOVE_ENPASSANT:
+            # the captured pawn stands beside the moving pawn, not on the landing square
+            squares[toMailbox[(start_sq & ~7) | (end_sq & 7)]] = EMPTY
+        elif kind == MOVE_PROMOTION:
+            squares[end] = pieceCodes[pieceNames[moved][0] + Move.promotion_pieces[move >> 14 & 3]]
+        elif moved == WHITE + KING or moved == BLACK + KING:
+            self.kings[moved - KING] = end
+            if kind == MOVE_CASTLE:
+                if end_sq - start_sq == 2:  # kingside
+                    squares[end - 1] = squares[end + 1]
+                    squares[end + 1] = EMPTY
+                else:  # queenside
+                    squares[end + 1] = squares[end - 2]
+                    squares[end - 2] = EMPTY
+
+        if (moved == WHITE + PAWN or moved == BLACK + PAWN) and abs(start_sq - end_sq) == 16:
+            self.enpassantPossible = divmod((start_sq + end_sq) // 2, 8)
+        else:
+            self.enpassantPossible = ()
+        self.enpassantPossibleLog.append(self.enpassantPossible)
+
+        self.castlingBits &= castleMask[start_sq] & castleMask[end_sq]
+        self.castlingBitsLog.append(self.castlingBits)
+
+        self.moveLog.append(move)
+        self.whiteToMove = not self.whiteToMove
+
+    def undoMove(self):
+        if len(self.moveLog) != 0:
+            move = self.moveLog.pop()
+            squares = self.squares
+            start_sq = move & 63
+            end_sq = move >> 6 & 63
+            start = toMailbox[start_sq]
+            end = toMailbox[end_sq]
+            kind = move & MOVE_KIND
+            moved = move >> 16 & 15
+            captured = move >> 20 & 15
+            squares[start] = moved
+
+            if kind == MOVE_ENPASSANT:
+                squares[end] = EMPTY
+                squares[toMailbox[(start_sq & ~7) | (end_sq & 7)]] = captured
+            else:
+                squares[end] = captured
+            if moved == WHITE + KING or moved == BLACK + KING:
+                self.kings[moved - KING] = start
+                if kind == MOVE_CASTLE:
+                    if end_sq - start_sq == 2:  # kingside
+                        squares[end + 1] = squares[end - 1]
+                        squares[end - 1] = EMPTY
+                    else:  # queenside
+                        squares[end - 2] = squares[end + 1]
+                        squares[end + 1] = EMPTY
+
+            self.enpassantPossibleLog.pop()
+            self.enpassantPossible = self.enpassantPossibleLog[-1]
+            self.castlingBitsLog.pop()
+            self.castlingBits = self.castlingBitsLog[-1]
+            self.whiteToMove = not self.whiteToMove
+            self.checkmate = False
+            self.stalemate = False
+
+    def isAttacked(self, index, enemy):
+        """
+        Determine if any piece of the enemy colour attacks the mailbox index.
+        """
+        squares = self.squares
+        knight = enemy + KNIGHT
+        king = enemy + KING
+        for offset in knightOffsets:
+            if squares[index + offset] == knight:
+                return True
+        for offset in rayOffsets:
+            if squares[index + offset] == king:
+                return True
+        # white pawns attack towards lower indexes, black pawns towards higher ones
+        pawn = enemy + PAWN
+        if enemy == WHITE:
+            if squares[index + 9] == pawn or squares[index + 11] == pawn:
+                return True
+        elif squares[index - 9] == pawn or squares[index - 11] == pawn:
+            return True
+        queen = enemy + QUEEN
+        for d in range(8):
+            offset = rayOffsets[d]
+            target = index + offset
+            while squares[target] == EMPTY:
+                target += offset
+            piece = squares[target]
+            if piece == queen or piece == enemy + (ROOK if d < 4 else BISHOP):
+                return True
+        return False
+
+    def squareUnderAttack(self, row, col):
+        """
+        Determine if enemy can attack the square row col
+        """
+        return self.isAttacked(toMailbox[row * 8 + col], BLACK if self.whiteToMove else WHITE)
+
+    def getPinsAndChecks(self, king, ally, enemy):
+        """
+        Scan out from the king: returns the pinned ally pieces (mailbox index to pin direction offset)
+        and the checking pieces as (mailbox index, direction offset) pairs, the offset is None for knights and pawns.
+        """
+        squares = self.squares
+        pins = {}
+        checks = []
+        queen = enemy + QUEEN
+        for d in range(8):
+            offset = rayOffsets[d]
+            slider = enemy + (ROOK if d < 4 else BISHOP)
+            pinned = None
+            target = king + offset
+            while True:
+                piece = squares[target]
+                if piece == EMPTY:
+                    target += offset
+                    continue
+                if ally <= piece < ally + 6:  # ally piece, may be pinned
+                    if pinned is None:
+                        pinned = target
+                        target += offset
+                        continue
+                elif piece == slider or piece == queen:
+                    if pinned is None:
+                        checks.append((target, offset))
+                    else:
+                        pins[pinned] = offset
+                break  # second ally piece, enemy piece that does not attack along this line, or sentinel
+        for offset in knightOffsets:
+            if squares[king + offset] == enemy + KNIGHT:
+                checks.append((king + offset, None))
+        pawn_offsets = (-9, -11) if ally == WHITE else (9, 11)
+        for offset in pawn_offsets:
+            if squares[king + offset] == enemy + PAWN:
+                checks.append((king + offset, None))
+        return pins, checks
+
+    def getValidMoves(self):
+        """
+        All moves considering checks.
+        """
+        squares = self.squares
+        if self.whiteToMove:
+            ally, enemy = WHITE, BLACK
+            forward = -10
+            start_row, promotion_row = 6, 0
+        else:
+            ally, enemy = BLACK, WHITE
+            forward = 10
+            start_row, promotion_row = 1, 7
+        king = self.kings[ally]
+        moves = []
+
+        pins, checks = self.getPinsAndChecks(king, ally, enemy)
+        self.inCheck = len(checks) != 0
+
+        # king moves, attacks are tested without our king so it cannot hide behind itself
+        king_move = fromMailbox[king] | (ally + KING) << 16
+        squares[king] = EMPTY
+        for offset in rayOffsets:
+            target = king + offset
+            piece = squares[target]
+            if (piece == EMPTY or enemy <= piece < enemy + 6) and not self.isAttacked(target, enemy):
+                moves.append(king_move | fromMailbox[target] << 6 | piece << 20)
+        squares[king] = ally + KING
+
+        if len(checks) < 2:  # in double check only the king can move
+            valid_targets = None  # mailbox indexes that block or capture the checking piece
+            if checks:
+                checker, offset = checks[0]
+                valid_targets = {checker}
+                if offset is not None:
+                    target = king + offset
+                    while target != checker:
+                        valid_targets.add(target)
+                        target += offset
+
+            for start_sq in range(64):
+                start = toMailbox[start_sq]
+                piece = squares[start]
+                if not ally <= piece < ally + 5:  # not ours, or the king which is done above
+                    continue
+                piece_type = piece - ally
+                pin = pins.get(start)
+                move = start_sq | piece << 16
+
+                if piece_type == PAWN:
+                    target = start + forward
+                    pushes = []
+                    if squares[target] == EMPTY and (pin is None or pin == forward or pin == -forward):
+                        pushes.append(target)
+                        if start_sq >> 3 == start_row and squares[target + forward] == EMPTY:
+                            pushes.append(target + forward)
+                    for side in (-1, 1):
+                        target = start + forward + side
+                        if enemy <= squares[target] < enemy + 6 and \
+                                (pin is None or pin == forward + side or pin == -forward - side):
+                            pushes.append(target)
+                    for target in pushes:
+                        if valid_targets is not None and target not in valid_targets:
+                            continue
+                        end_sq = fromMailbox[target]
+                        pawn_move = move | end_sq << 6 | squares[target] << 20
+                        if end_sq >> 3 == promotion_row:
+                            for i in range(len(Move.promotion_pieces)):
+                                moves.append(pawn_move | MOVE_PROMOTION | i << 14)
+                        else:
+                            moves.append(pawn_move)
+
+                elif piece_type == KNIGHT:
+                    if pin is not None:  # a pinned knight can never move
+                        continue
+                    for offset in knightOffsets:
+                        target = start + offset
+                        captured = squares[target]
+                        if (captured == EMPTY or enemy <= captured < enemy + 6) and \
+                                (valid_targets is None or target in valid_targets):
+                            moves.append(move | fromMailbox[target] << 6 | captured << 20)
+
+                else:
+                    if piece_type == BISHOP:
+                        offsets = rayOffsets[4:]
+                    elif piece_type == ROOK:
+                        offsets = rayOffsets[:4]
+                    else:
+                        offsets = rayOffsets
+                    for offset in offsets:
+                        if pin is not None and pin != offset and pin != -offset:
+                            continue
+                        target = start + offset
+                        while squares[target] == EMPTY:
+                            if valid_targets is None or target in valid_targets:
+                                moves.append(move | fromMailbox[target] << 6)
+                            target += offset
+                        captured = squares[target]
+                        if enemy <= captured < enemy + 6 and (valid_targets is None or target in valid_targets):
+                            moves.append(move | fromMailbox[target] << 6 | captured << 20)
+
+            # en passant, checked by playing it on the board since it removes two pieces at once
+            if self.enpassantPossible != ():
+                ep_sq = self.enpassantPossible[0] * 8 + self.enpassantPossible[1]
+                ep = toMailbox[ep_sq]
+                captured = ep - forward
+                for start in (captured - 1, captured + 1):
+                    if squares[start] == ally + PAWN:
+                        squares[start] = EMPTY
+                        squares[captured] = EMPTY
+                        squares[ep] = ally + PAWN
+                        attacked = self.isAttacked(king, enemy)
+                        squares[start] = ally + PAWN
+                        squares[captured] = enemy + PAWN
+                        squares[ep] = EMPTY
+                        if not attacked:
+                            moves.append(fromMailbox[start] | ep_sq << 6 | MOVE_ENPASSANT | (ally + PAWN) << 16 |
+                                         (enemy + PAWN) << 20)
+
+            # castling, the king may not start on, pass through or land on an attacked square
+            if not checks:
+                kingside, queenside = (WKS, WQS) if ally == WHITE else (BKS, BQS)
+                if self.castlingBits & kingside and squares[king + 1] == EMPTY and squares[king + 2] == EMPTY and \
+                        not self.isAttacked(king + 1, enemy) and not self.isAttacked(king + 2, enemy):
+                    moves.append(king_move | fromMailbox[king + 2] << 6 | MOVE_CASTLE)
+                if self.castlingBits & queenside and squares[king - 1] == EMPTY and squares[king - 2] == EMPTY and \
+                        squares[king - 3] == EMPTY and \
+                        not self.isAttacked(king - 1, enemy) and not self.isAttacked(king - 2, enemy):
+                    moves.append(king_move | fromMailbox[king - 2] << 6 | MOVE_CASTLE)
+
+        if len(moves) == 0:
+            if self.inCheck:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+        else:
+            self.checkmate = False
+            self.stalemate = False
+        return moves
@@ -0,0 +1,193 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+from collections import defaultdict
+
+from ChessGame import GameState, MOVE_CASTLE, MOVE_KIND, MOVE_PROMOTION, Move, MoveCache
+from Pgn import replayGames
+
+# opening book in the Polyglot file layout: a file of 16-byte big-endian entries sorted by key,
+# each entry is the 64-bit position key, the move, its weight and a 32-bit learn field that is left at 0
+# the move is packed as to file, to rank, from file, from rank in 3 bits each, starting from the lowest bits,
+# then the promotion piece (1 knight, 2 bishop, 3 rook, 4 queen). castling is written as the king taking its own rook
+# the keys are GameState.zobristKey rather than the Polyglot random numbers, so books have to be built with this
+# module, files built by other Polyglot tools will not find any positions
+
+entryFormat = struct.Struct(">QHHI")
+keyFormat = struct.Struct(">Q")
+entrySize = entryFormat.size
+promotionCodes = {"N": 1, "B": 2, "R": 3, "Q": 4}
+
+
+def encodeMove(move):
+    """
+    Book move of a packed move.
+    """
+    start_row, start_col = divmod(move & 63, 8)
+    end_row, end_col = divmod(move >> 6 & 63, 8)
+    kind = move & MOVE_KIND
+    if kind == MOVE_CASTLE:
+        end_col = 7 if end_col == 6 else 0  # the rook's square
+    book_move = end_col | (7 - end_row) << 3 | start_col << 6 | (7 - start_row) << 9
+    if kind == MOVE_PROMOTION:
+        book_move |= promotionCodes[Move.promotion_pieces[move >> 14 & 3]] << 12
+    return book_move
+
+
+def decodeMove(gameState, bookMove):
+    """
+    The packed legal move of the current position that a book move stands for, None if there is none.
+    """
+    for move in gameState.getValidMoves():
+        if encodeMove(move) == bookMove:
+            return move
+    return None
+
+
+class OpeningBook:
+    """
+    Read-only opening book. The file is memory-mapped and entries are found by binary search on the key,
+    so opening a book costs nothing whatever its size, and no Python objects are made for entries that are not asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size % entrySize:
+            self.file.close()
+            raise ValueError("%s is not a book file, its size is not a multiple of %d bytes" % (path, entrySize))
+        self.size = size // entrySize
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def findFirst(self, key):
+        """
+        Index of the first entry whose key is not less than key.
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if keyFormat.unpack_from(self.data, middle * entrySize)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def getEntries(self, key):
+        """
+        (book move, weight) of every entry for a position key.
+        """
+        entries = []
+        index = self.findFirst(key)
+        while index < self.size:
+            entry_key, book_move, weight, learn = entryFormat.unpack_from(self.data, index * entrySize)
+            if entry_key != key:
+                break
+            entries.append((book_move, weight))
+            index += 1
+        return entries
+
+    def getMoves(self, gameState):
+        """
+        (packed move, weight) of the book moves of the current position that are legal in it.
+        """
+        moves = []
+        for book_move, weight in self.getEntries(gameState.zobristKey):
+            move = decodeMove(gameState, book_move)
+            if move is not None:
+                moves.append((move, weight))
+        return moves
+
+    def chooseMove(self, gameState, rng=random):
+        """
+        A book move for the current position picked at random in proportion to the weights, None when out of book.
+        """
+        moves = [(move, weight) for move, weight in self.getMoves(gameState) if weight > 0]
+        if not moves:
+            return None
+        return rng.choices([move for move, weight in moves], [weight for move, weight in moves])[0]
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.size
+
+
+def buildBook(pgnPaths, bookPath, maxPly=20, minGames=1):
+    """
+    Write a book of the first maxPly moves of every game in the PGN files, keeping moves played in at least minGames
+    games. As with the usual Polyglot builders a move scores 2 for each game the side playing it won and 1 for a draw,
+    the weights are scaled down to fit 16 bits if needed. A game with a move that cannot be read is skipped as a
+    whole. Returns (games, skipped games, entries).
+    """
+    counts = defaultdict(int)  # (key, book move) -> games
+    scores = defaultdict(int)  # (key, book move) -> score
+    moveCache = MoveCache()  # opening positions repeat from game to game
+    games = skipped = 0
+    for path in pgnPaths:
+        for tags, replay in replayGames(path, moveCache=moveCache):
+            result = tags.get("Result", "*")
+            game_entries = []  # (key, book move, score), added to the book once the whole game has been read
+            try:
+                for gameState, move in replay:  # replayed to the end, a game with an unreadable move is left out
+                    if len(gameState.moveLog) >= maxPly:
+                        continue
+                    if result == "1/2-1/2":
+                        score = 1
+                    elif result == ("1-0" if gameState.whiteToMove else "0-1"):
+                        score = 2
+                    else:
+                        score = 0
+                    game_entries.append((gameState.zobristKey, encodeMove(move), score))
+            except ValueError:  # a PgnError, or a FEN tag that cannot be read
+                skipped += 1
+                continue
+            games += 1
+            for key, book_move, score in game_entries:
+                counts[(key, book_move)] += 1
+                scores[(key, book_move)] += score
+
+    entries = sorted(entry for entry, games_played in counts.items() if games_played >= minGames)
+    scale = max(1, (max((scores[entry] for entry in entries), default=0) + 65534) // 65535)
+    with open(bookPath, "wb") as book_file:
+        for key, book_move in entries:
+            weight = scores[(key, book_move)] // scale
+            book_file.write(entryFormat.pack(key, book_move, weight, 0))
+    return games, skipped, len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from PGN files or look up a position in one.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="build a book from PGN files")
+    build_parser.add_argument("pgn", nargs="+", help="PGN files to read")
+    build_parser.add_argument("-o", "--output", default="book.bin", help="book file to write")
+    build_parser.add_argument("--ply", type=int, default=20, help="number of moves from the start of each game to use")
+    build_parser.add_argument("--min-games", type=int, default=1, help="leave out moves played in fewer games")
+    probe_parser = subparsers.add_parser("probe", help="list the book moves of a position")
+    probe_parser.add_argument("book", help="book file to read")
+    probe_parser.add_argument("--fen", help="position to look up, the starting position by default")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        games, skipped, entries = buildBook(args.pgn, args.output, args.ply, args.min_games)
+        print("%d games, %d skipped, %d entries written to %s" % (games, skipped, entries, args.output))
+    else:
+        book = OpeningBook(args.book)
+        gameState = GameState.fromFen(args.fen) if args.fen else GameState()
+        moves = sorted(book.getMoves(gameState), key=lambda entry: -entry[1])
+        total = sum(weight for move, weight in moves)
+        for move, weight in moves:
+            print("%s %d %.1f%%" % (Move.fromCode(move).getUciNotation(), weight, 100 * weight / total if total else 0))
+        if not moves:
+            print("position not in book")
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
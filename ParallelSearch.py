@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessGame import CastleRights, GameState, Move, pieceCodes, pieceNames
+from Search import MATE_SCORE, Search, SearchResult
+from TranspositionTable import TranspositionTable
+
+# root-split search: the legal moves at the root are dealt out to a pool of worker processes,
+# each searches its share with its own transposition table and the results are merged in a fixed order
+# positions travel to the workers as a packed board, a few dozen bytes, instead of a pickled GameState with its logs
+
+workerTable = None  # transposition table of a worker process, kept between searches
+
+
+def packPosition(gameState):
+    """
+    Compact picklable form of the current position: piece codes, side to move, castle rights index and en passant square.
+    """
+    return (bytes(pieceCodes[piece] for row in gameState.board for piece in row), gameState.whiteToMove,
+            gameState.currentCastlingRights.getIndex(), gameState.enpassantPossible)
+
+
+def unpackPosition(packed):
+    """
+    GameState for a position made by packPosition.
+    """
+    codes, white_to_move, castle_index, enpassant = packed
+    board = [[pieceNames[code] for code in codes[row * 8:row * 8 + 8]] for row in range(8)]
+    gameState = GameState()
+    gameState.setPosition(board, white_to_move, CastleRights(bool(castle_index & 1), bool(castle_index & 4),
+                                                             bool(castle_index & 2), bool(castle_index & 8)), enpassant)
+    return gameState
+
+
+def initWorker(tableSizeMB):
+    global workerTable
+    workerTable = TranspositionTable(tableSizeMB)
+
+
+def searchRootMoves(packed, rootMoves, maxDepth, timeLimit, nodeLimit):
+    """
+    Run in a worker process: search the given root moves of a packed position.
+    Returns the (best move, score) of every completed depth and the work done.
+    """
+    search = Search(unpackPosition(packed), maxDepth, timeLimit, nodeLimit, workerTable, rootMoves=rootMoves)
+    result = search.search()
+    iterations = [(iteration.bestMove, iteration.score) for iteration in search.iterations]
+    return iterations, (result.bestMove, result.score), result.nodes, result.qnodes, result.elapsed, os.getpid()
+
+
+class WorkerStats:
+    """
+    What one worker did for a parallel search.
+    """
+
+    def __init__(self, worker, pid, moves, depth, nodes, qnodes, elapsed):
+        self.worker = worker
+        self.pid = pid
+        self.moves = moves  # number of root moves it searched
+        self.depth = depth
+        self.nodes = nodes
+        self.qnodes = qnodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self):
+        return (self.nodes + self.qnodes) / self.elapsed if self.elapsed else 0
+
+    def __str__(self):
+        return "worker %d (pid %d): %d root moves, depth %d, nodes %d qnodes %d, %.2fs, nps %.0f" % (
+            self.worker, self.pid, self.moves, self.depth, self.nodes, self.qnodes, self.elapsed, self.nps)
+
+
+class ParallelSearch:
+    """
+    Search the root moves of a position in parallel on a pool of processes, which is kept between searches.
+    The merged result is the best score at the deepest depth every worker completed, ties going to the move
+    that comes first in getValidMoves order, so the same worker results always give the same answer.
+    The result is a SearchResult with the summed work and a workerStats list.
+    """
+
+    def __init__(self, workers=None, tableSizeMB=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, initializer=initWorker, initargs=(tableSizeMB,))
+
+    def search(self, gameState, maxDepth=64, timeLimit=None, nodeLimit=None):
+        start = time.perf_counter()
+        root_moves = gameState.getValidMoves()
+        if len(root_moves) == 0:  # scored the way Search scores it, mated or stalemate
+            result = SearchResult(None, -MATE_SCORE if gameState.inCheck else 0, 0, 0, time.perf_counter() - start)
+            result.workerStats = []
+            return result
+        packed = packPosition(gameState)
+        workers = min(self.workers, len(root_moves))
+        worker_node_limit = nodeLimit // workers if nodeLimit is not None else None
+        shares = [root_moves[i::workers] for i in range(workers)]  # dealt out so every worker gets a mix
+        futures = [self.pool.submit(searchRootMoves, packed, share, maxDepth, timeLimit, worker_node_limit)
+                   for share in shares]
+        outcomes = [future.result() for future in futures]
+
+        order = {move: i for i, move in enumerate(root_moves)}
+        depth = min(len(outcome[0]) for outcome in outcomes)
+        if depth > 0:
+            candidates = [outcome[0][depth - 1] for outcome in outcomes]
+        else:  # some worker ran out of time before finishing one depth, use what each of them had
+            candidates = [outcome[1] for outcome in outcomes]
+        best_move, score = max(candidates, key=lambda candidate: (candidate[1], -order[candidate[0]]))
+
+        result = SearchResult(best_move, score, depth, sum(outcome[2] for outcome in outcomes),
+                              time.perf_counter() - start, sum(outcome[3] for outcome in outcomes))
+        result.workerStats = [WorkerStats(i, outcome[5], len(shares[i]), len(outcome[0]), outcome[2], outcome[3],
+                                          outcome[4]) for i, outcome in enumerate(outcomes)]
+        return result
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a position with the root moves split across processes.")
+    parser.add_argument("--fen", help="position to search, the starting position by default")
+    parser.add_argument("--depth", type=int, help="deepest iteration to search")
+    parser.add_argument("--time", type=float, help="time budget in seconds")
+    parser.add_argument("--nodes", type=int, help="node budget, shared between the workers")
+    parser.add_argument("--workers", type=int, help="number of worker processes, one per core by default")
+    parser.add_argument("--hash", type=int, default=16, metavar="MB", help="transposition table size per worker")
+    args = parser.parse_args()
+
+    if args.depth is None and args.time is None and args.nodes is None:
+        args.time = 5.0  # some budget is needed, otherwise the search would never stop
+    gameState = GameState.fromFen(args.fen) if args.fen else GameState()
+    parallelSearch = ParallelSearch(args.workers, args.hash)
+    result = parallelSearch.search(gameState, args.depth or 64, args.time, args.nodes)
+    parallelSearch.close()
+    for stats in result.workerStats:
+        print(stats)
+    print(result)
+    print("bestmove %s" % (Move.fromCode(result.bestMove).getUciNotation() if result.bestMove is not None else "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import sys
+import time
+
+from Bitboard import BitboardGameState
+from ChessGame import GameState, Move, MoveCache
+from Mailbox import MailboxGameState
+
+# perft counts every leaf of the legal move tree to a fixed depth, any bug in getValidMoves, makeMove or undoMove
+# shows up as a wrong count. positions and counts are the standard ones from https://www.chessprogramming.org/Perft_Results
+# each entry is (name, FEN, node counts for depth 1, 2, 3, ...)
+perftPositions = [
+    ("start position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     (20, 400, 8902, 197281, 4865609)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     (48, 2039, 97862, 4085603)),
+    ("en passant and rank pins", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     (14, 191, 2812, 43238, 674624)),
+    ("promotions and castling", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     (6, 264, 9467, 422333)),
+    ("promotions and castling, mirrored", "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+     (6, 264, 9467, 422333)),
+    ("promotion with discovered check", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     (44, 1486, 62379, 2103487)),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     (46, 2079, 89890, 3894594)),
+]
+
+# every core is built from a GameState loaded from FEN
+stateBuilders = {"gamestate": lambda gameState: gameState, "bitboard": BitboardGameState.fromGameState,
+                 "mailbox": MailboxGameState.fromGameState}
+
+
+def loadPosition(fen, moveCache=None):
+    """
+    GameState for a FEN, with the legal move cache only when one is given, so perft measures move generation.
+    """
+    return GameState.fromFen(fen, moveCache)
+
+
+def perft(gameState, depth, staged=False):
+    """
+    Count the leaf nodes of the legal move tree below the current position.
+    With staged the moves come from the lazy iterValidMoves generator instead of getValidMoves.
+    """
+    moves = list(gameState.iterValidMoves()) if staged else gameState.getValidMoves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gameState.makeMove(move)
+        nodes += perft(gameState, depth - 1, staged)
+        gameState.undoMove()
+    return nodes
+
+
+def verifyIncremental(gameState, depth):
+    """
+    Walk the move tree and check the incrementally updated zobrist key and evaluation against a full recompute
+    at every node. Returns the number of nodes checked, raises AssertionError on the first mismatch.
+    """
+    line = " ".join(Move.fromCode(move).getUciNotation() for move in gameState.moveLog)
+    assert gameState.zobristKey == gameState.computeZobristKey(), "zobrist key mismatch after %s" % line
+    assert (gameState.mgScore, gameState.egScore, gameState.phase) == gameState.computeEvaluation(), \
+        "evaluation mismatch after %s" % line
+    if depth == 0:
+        return 1
+    nodes = 1
+    for move in gameState.getValidMoves():
+        gameState.makeMove(move)
+        nodes += verifyIncremental(gameState, depth - 1)
+        gameState.undoMove()
+    assert gameState.zobristKey == gameState.computeZobristKey(), "zobrist key mismatch after undoing to %s" % line
+    assert (gameState.mgScore, gameState.egScore, gameState.phase) == gameState.computeEvaluation(), \
+        "evaluation mismatch after undoing to %s" % line
+    return nodes
+
+
+def divide(gameState, depth):
+    """
+    Perft split by root move, returns a list of (packed move, nodes) pairs.
+    """
+    results = []
+    for move in gameState.getValidMoves():
+        gameState.makeMove(move)
+        results.append((move, perft(gameState, depth - 1) if depth > 1 else 1))
+        gameState.undoMove()
+    return results
+
+
+def runSuite(buildState, maxDepth=None, maxNodes=200000, out=sys.stdout, staged=False, moveCache=None):
+    """
+    Run perft over every position in perftPositions and compare against the known counts.
+    Each position is searched to maxDepth, or when maxDepth is None to the deepest depth with at most maxNodes nodes.
+    Returns True when every count matched.
+    """
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, counts in perftPositions:
+        for depth in range(1, len(counts) + 1):
+            expected = counts[depth - 1]
+            if (maxDepth is not None and depth > maxDepth) or (maxDepth is None and expected > maxNodes):
+                break
+            gameState = buildState(loadPosition(fen, moveCache))
+            start = time.perf_counter()
+            nodes = perft(gameState, depth, staged)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = "ok" if nodes == expected else "FAIL (expected %d)" % expected
+            passed = passed and nodes == expected
+            out.write("%-36s depth %d %10d nodes %8.2fs %9.0f nodes/s  %s\n" % (
+                name, depth, nodes, elapsed, nodes / elapsed if elapsed else 0, status))
+    out.write("total %d nodes in %.2fs, %.0f nodes/s\n" % (
+        total_nodes, total_time, total_nodes / total_time if total_time else 0))
+    if moveCache is not None:
+        out.write("%s\n" % moveCache)
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft correctness and speed checks for the move generator.")
+    parser.add_argument("--core", choices=sorted(stateBuilders), default="gamestate",
+                        help="position representation to test")
+    parser.add_argument("--depth", type=int, help="search every position to this depth")
+    parser.add_argument("--max-nodes", type=int, default=200000,
+                        help="without --depth, search each position to the deepest depth below this many nodes")
+    parser.add_argument("--divide", metavar="FEN", help="print the node count below each root move of FEN")
+    parser.add_argument("--verify-incremental", "--verify-hash", action="store_true",
+                        help="check the incremental zobrist key and evaluation against a full recompute at every node "
+                             "(GameState only)")
+    parser.add_argument("--staged", action="store_true",
+                        help="count moves from the staged iterValidMoves generator (GameState only)")
+    parser.add_argument("--move-cache", type=int, default=0, metavar="SIZE",
+                        help="give GameState a legal move cache of SIZE positions (GameState only)")
+    args = parser.parse_args()
+
+    buildState = stateBuilders[args.core]
+    if args.verify_incremental:
+        for name, fen, counts in perftPositions:
+            nodes = verifyIncremental(loadPosition(fen), args.depth or 3)
+            print("%-36s %d nodes, zobrist keys and evaluation ok" % (name, nodes))
+        return
+    if args.divide:
+        depth = args.depth or 1
+        gameState = buildState(loadPosition(args.divide))
+        start = time.perf_counter()
+        results = divide(gameState, depth)
+        elapsed = time.perf_counter() - start
+        for notation, nodes in sorted((Move.fromCode(move).getUciNotation(), nodes) for move, nodes in results):
+            print("%s: %d" % (notation, nodes))
+        total = sum(nodes for move, nodes in results)
+        print("\n%d moves, %d nodes in %.2fs, %.0f nodes/s" % (
+            len(results), total, elapsed, total / elapsed if elapsed else 0))
+        return
+    moveCache = MoveCache(args.move_cache) if args.move_cache else None
+    if not runSuite(buildState, args.depth, args.max_nodes, staged=args.staged, moveCache=moveCache):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
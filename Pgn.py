@@ -0,0 +1,343 @@
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessGame import GameState, MOVE_CASTLE, MOVE_KIND, MOVE_PROMOTION, Move, MoveCache, pieceNames
+
+# reading games in PGN, the format game databases are distributed in
+# a game is its tag pairs followed by the movetext, moves are in SAN (standard algebraic notation) and are resolved
+# against GameState's legal moves, so an illegal or ambiguous move in a file is an error instead of a wrong position
+# files are read in fixed-size chunks and games are generated one at a time, so memory stays the same however big
+# the file is. to replay a file on several processes it is split at game boundaries, lines where an [Event tag starts
+
+tagPattern = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+# comments, variations, NAGs, move numbers, results and everything else up to the next space or bracket
+tokenPattern = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s{}();]+")
+zeroCastlePattern = re.compile(r"0-0(?:-0)?[+#!?]*$")  # castling written with zeros, which looks like a move number
+sanPattern = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+results = ("1-0", "0-1", "1/2-1/2", "*")
+CHUNK_SIZE = 1 << 20
+gameStart = b"\n[Event "
+rosterTags = ("Event", "Site", "Date", "Round", "White", "Black", "Result")  # written first, in this order
+startFen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+lineLength = 80
+maxErrors = 20  # error messages kept per worker, the others are only counted
+# movetext checks, (movetext, number of main line moves), run with --check. every game is also written back
+# with writeMovetext and has to read the same
+movetextChecks = [
+    ("1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. 0-0 Nf6 5. d3 0-0 *", 10),
+    ("1. d4 d5 2. Nc3 Nc6 3. Bf4 Bf5 4. Qd2 Qd7 5. 0-0-0 O-O-O 1/2-1/2", 10),
+    ("1. e4 {best by test} (1. d4 d5) 1... e5 $1 2. Nf3 ; a comment to the end of the line\nNc6 3. Bb5 a6 1-0", 6),
+    ("1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0", 7),
+    ("1. e4 d5 2. exd5 Nf6 3. Nc3 Nbd7 4. Nge2 Nxd5 5. Nxd5 c6 6. Nec3 cxd5 *", 12),
+]
+
+
+class PgnError(ValueError):
+    pass
+
+
+def readLines(pgnFile, end=None, chunkSize=CHUNK_SIZE):
+    """
+    Yield the lines of a file opened in binary mode as text, from its current position up to the byte offset end,
+    reading chunkSize bytes at a time. A line that starts before end is read in full.
+    """
+    offset = pgnFile.tell()  # file offset of the next line
+    pending = b""
+    while end is None or offset < end:
+        chunk = pgnFile.read(chunkSize)
+        if not chunk:
+            if pending:
+                yield pending.decode("utf-8", "replace")
+            return
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()  # not complete yet
+        for line in lines:
+            if end is not None and offset >= end:
+                return
+            offset += len(line) + 1
+            yield line.decode("utf-8", "replace")
+
+
+def findGameStart(pgnFile, offset, chunkSize=CHUNK_SIZE):
+    """
+    Byte offset of the first game that starts after offset, or the end of the file.
+    """
+    pgnFile.seek(offset)
+    data_offset = offset
+    data = b""
+    while True:
+        chunk = pgnFile.read(chunkSize)
+        if not chunk:
+            return data_offset + len(data)
+        data += chunk
+        found = data.find(gameStart)
+        if found >= 0:
+            return data_offset + found + 1
+        keep = len(gameStart) - 1  # the marker may be cut in two by a chunk boundary
+        data_offset += len(data) - keep
+        data = data[-keep:]
+
+
+def splitFile(path, parts):
+    """
+    Split a PGN file into at most parts (start, end) byte ranges that begin at game boundaries.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as pgn_file:
+        for part in range(1, parts):
+            boundary = findGameStart(pgn_file, max(size * part // parts, boundaries[-1]))
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+def commentContinues(line, inComment):
+    """
+    Whether a { } comment is still open at the end of a movetext line.
+    """
+    for char in line:
+        if inComment:
+            inComment = char != "}"
+        elif char == "{":
+            inComment = True
+        elif char == ";":  # the rest of the line is a comment of its own
+            break
+    return inComment
+
+
+def readGames(lines):
+    """
+    Yield the (tags, movetext) of every game in an iterable of PGN lines, such as an open file, one game at a time.
+    """
+    tags = {}
+    movetext = []
+    in_comment = False  # inside a { } comment, which may span lines that look like tags
+    for line in lines:
+        line = line.strip()
+        if in_comment or ("{" in line and not line.startswith("[")):
+            in_comment = commentContinues(line, in_comment)
+            movetext.append(line)
+        elif line.startswith("["):
+            if movetext:  # tags after movetext start the next game
+                yield tags, "\n".join(movetext)  # lines kept apart for comments that run to the end of a line
+                tags, movetext = {}, []
+            match = tagPattern.match(line)
+            if match:
+                tags[match.group(1)] = match.group(2)
+        elif line and not line.startswith("%"):  # % at the start of a line escapes it
+            movetext.append(line)
+    if tags or movetext:
+        yield tags, "\n".join(movetext)
+
+
+def parseMovetext(movetext):
+    """
+    The SAN moves of the main line of a movetext, without comments, variations, annotations and move numbers.
+    """
+    moves = []
+    variation_depth = 0
+    for token in tokenPattern.findall(movetext):
+        if token == "(":
+            variation_depth += 1
+        elif token == ")":
+            variation_depth -= 1
+        elif variation_depth == 0 and (zeroCastlePattern.match(token) or
+                                       token[0] not in "{;$" and not token[0].isdigit() and token not in results):
+            moves.append(token)
+    return moves
+
+
+def sanToMove(gameState, san):
+    """
+    The packed legal move of the current position that a SAN move such as Nbd7, exf6 or e8=Q describes.
+    """
+    text = san.rstrip("+#!?")
+    if text.endswith("e.p."):
+        text = text[:-4]
+    candidates = []
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        end_col = 6 if len(text) == 3 else 2
+        for move in gameState.getValidMoves():
+            if move & MOVE_KIND == MOVE_CASTLE and (move >> 6 & 63) % 8 == end_col:
+                candidates.append(move)
+    else:
+        match = sanPattern.match(text)
+        if match is None:
+            raise PgnError("cannot read move %r" % san)
+        piece, from_file, from_rank, end_square, promotion = match.groups()
+        piece = piece or "p"
+        end_sq = Move.ranks_to_rows[end_square[1]] * 8 + Move.files_to_cols[end_square[0]]
+        for move in gameState.getValidMoves():
+            if move >> 6 & 63 != end_sq or pieceNames[move >> 16 & 15][1] != piece:
+                continue
+            if from_file is not None and (move & 63) % 8 != Move.files_to_cols[from_file]:
+                continue
+            if from_rank is not None and (move & 63) // 8 != Move.ranks_to_rows[from_rank]:
+                continue
+            if move & MOVE_KIND == MOVE_PROMOTION and Move.promotion_pieces[move >> 14 & 3] != (promotion or "Q"):
+                continue
+            candidates.append(move)
+    if len(candidates) != 1:
+        raise PgnError("%s move %r" % ("illegal" if len(candidates) == 0 else "ambiguous", san))
+    return candidates[0]
+
+
+def replayGame(movetext, moveCache=None, tags=None):
+    """
+    Yield the GameState before each move of a game's main line together with the packed move, the move is made
+    once the caller resumes the generator. Games with a FEN tag start from that position.
+    A PgnError stops the game at the move that could not be read.
+    """
+    gameState = GameState(moveCache)
+    if tags is not None and "FEN" in tags:
+        gameState.setFen(tags["FEN"])
+    for san in parseMovetext(movetext):
+        move = sanToMove(gameState, san)
+        yield gameState, move
+        gameState.makeMove(move)
+
+
+def writeMovetext(gameState, moves, result="*"):
+    """
+    Movetext of packed moves played from the current position of gameState: SAN with move numbers, ending in the
+    result and wrapped at lineLength columns. gameState is back where it was when it returns.
+    """
+    tokens = []
+    fullmove_number = int(gameState.toFen().split()[5])
+    for i, move in enumerate(moves):
+        if gameState.whiteToMove:
+            tokens.append("%d." % fullmove_number)
+        elif i == 0:
+            tokens.append("%d..." % fullmove_number)
+        tokens.append(gameState.getSanNotation(move))
+        gameState.makeMove(move)
+        if gameState.whiteToMove:
+            fullmove_number += 1
+    for move in moves:
+        gameState.undoMove()
+    tokens.append(result)
+
+    lines = []
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > lineLength:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines)
+
+
+def writeGame(pgnFile, tags, gameState, moves, result="*"):
+    """
+    Write a game played from the current position of gameState to a file opened for text: its tags, the seven tag
+    roster first with "?" for the missing ones, then the movetext. Games that do not start from the starting position
+    get SetUp and FEN tags.
+    """
+    tags = dict(tags, Result=result)
+    fen = gameState.toFen()
+    if fen != startFen:
+        tags["SetUp"] = "1"
+        tags["FEN"] = fen
+    for name in rosterTags + tuple(name for name in tags if name not in rosterTags):
+        value = tags.get(name, "?")
+        pgnFile.write('[%s "%s"]\n' % (name, value.replace("\\", "\\\\").replace('"', '\\"')))
+    pgnFile.write("\n%s\n\n" % writeMovetext(gameState, moves, result))
+
+
+def replayGames(path, start=0, end=None, moveCache=None):
+    """
+    Yield (tags, replay) for every game of a PGN file between the byte offsets start and end, where replay is the
+    replayGame generator of the game's positions and moves. A game has to be replayed before the next one is read.
+    """
+    with open(path, "rb") as pgn_file:
+        pgn_file.seek(start)
+        for tags, movetext in readGames(readLines(pgn_file, end)):
+            yield tags, replayGame(movetext, moveCache, tags)
+
+
+def replayRange(path, start, end):
+    """
+    Run in a worker process: replay every game in a byte range of a PGN file.
+    Returns the number of games, moves and games with an error, and the first error messages.
+    """
+    games = moves = failed = 0
+    errors = []
+    moveCache = MoveCache()  # opening positions repeat from game to game
+    for tags, replay in replayGames(path, start, end, moveCache):
+        games += 1
+        try:
+            for gameState, move in replay:
+                moves += 1
+        except ValueError as error:  # a PgnError, or a FEN tag that cannot be read
+            failed += 1
+            if len(errors) < maxErrors:
+                errors.append("%s - %s, %s: %s" % (tags.get("White", "?"), tags.get("Black", "?"),
+                                                   tags.get("Date", "?"), error))
+    return games, moves, failed, errors
+
+
+def replayFile(path, workers=None):
+    """
+    Replay every game of a PGN file on a pool of worker processes, each taking a share of the file split at
+    game boundaries. Returns (games, moves, games with an error, error messages, seconds).
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    ranges = splitFile(path, workers)
+    if len(ranges) <= 1:
+        outcomes = [replayRange(path, range_start, range_end) for range_start, range_end in ranges]
+    else:
+        with ProcessPoolExecutor(len(ranges)) as pool:
+            outcomes = list(pool.map(replayRange, [path] * len(ranges), *zip(*ranges)))
+    games = sum(outcome[0] for outcome in outcomes)
+    moves = sum(outcome[1] for outcome in outcomes)
+    failed = sum(outcome[2] for outcome in outcomes)
+    errors = [error for outcome in outcomes for error in outcome[3]]
+    return games, moves, failed, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay every game of PGN files to check them against the rules.")
+    parser.add_argument("pgn", nargs="*", help="PGN files to read")
+    parser.add_argument("--workers", type=int, help="number of worker processes, one per core by default")
+    parser.add_argument("--check", action="store_true", help="replay the games in movetextChecks")
+    args = parser.parse_args()
+
+    if args.check:
+        passed = True
+        for movetext, expected in movetextChecks:
+            try:
+                moves = [move for gameState, move in replayGame(movetext)]
+                written = writeMovetext(GameState(), moves)  # written back in SAN, it has to read the same
+                if len(moves) != expected:
+                    status = "FAIL (%d moves, expected %d)" % (len(moves), expected)
+                elif [move for gameState, move in replayGame(written)] != moves:
+                    status = "FAIL (written as %r)" % written
+                else:
+                    status = "ok"
+            except PgnError as error:
+                status = "FAIL (%s)" % error
+            passed = passed and status == "ok"
+            print("%-70s %s" % (movetext.replace("\n", " ")[:70], status))
+        if not passed:
+            sys.exit(1)
+
+    for path in args.pgn:
+        games, moves, failed, errors, elapsed = replayFile(path, args.workers)
+        for error in errors:
+            print(error)
+        print("%s: %d games, %d moves, %d with errors in %.2fs, %.0f games/s, %.0f moves/s" % (
+            path, games, moves, failed, elapsed, games / elapsed if elapsed else 0, moves / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+    main()
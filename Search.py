@@ -0,0 +1,491 @@
+import argparse
+import sys
+import time
+
+from Bitbases import Bitbases
+from ChessGame import GameState, MOVE_ENPASSANT, MOVE_KIND, MOVE_PROMOTION, Move, kingSquares, \
+    knightSquares, pawnAttackerSquares, pieceNames, raySquares
+from Evaluation import pieceValues
+from TranspositionTable import EXACT, LOWER, TranspositionTable, UPPER
+
+# negamax alpha-beta search over GameState with iterative deepening
+# scores are in centipawns from the point of view of the side to move
+
+MATE_SCORE = 100000  # checkmate at the root, mates further away score a little less
+INFINITY = 1000000
+MATE_BOUND = MATE_SCORE - 1000  # scores beyond this are mates
+MAX_PLY = 128
+KNOWN_WIN = 50000  # bitbase win, the evaluation is added so the search still makes progress towards mate
+
+# move ordering scores: the transposition table move, then captures and promotions, killers, and quiet moves by history
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORE = 1 << 27  # the second killer scores one less
+# most valuable victim, least valuable attacker: mvvLva[moved piece code][captured piece code]
+pieceOrder = "pNBRQK"
+mvvLva = [[(pieceOrder.index(victim[1]) + 1) * 10 - pieceOrder.index(attacker[1]) if attacker != "--" and victim != "--"
+           else 0 for victim in pieceNames] for attacker in pieceNames]
+
+# quiescence search skips a capture when even winning the captured piece plus this margin cannot reach alpha
+DELTA_MARGIN = 200
+# piece values for static exchange, a king may only capture last
+exchangeValues = dict(pieceValues, K=20000)
+# static exchange checks, (FEN, move in long algebraic notation, expected score), run with --check-see
+# the first two are the standard examples from https://www.chessprogramming.org/SEE_-_The_Swap_Algorithm
+exchangePositions = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),
+    ("4k3/8/3p4/4p3/8/8/8/4Q1K1 w - - 0 1", "e1e5", -800),
+]
+
+
+def leastValuableAttacker(board, row, col, color, removed):
+    """
+    Square and value of the cheapest piece of the given color attacking row col, or None.
+    Squares in removed count as empty, so pieces behind an attacker that has already captured join in.
+    """
+    for square in pawnAttackerSquares[color][row][col]:
+        if board[square[0]][square[1]] == color + "p" and square not in removed:
+            return square, exchangeValues["p"]
+    for square in knightSquares[row][col]:
+        if board[square[0]][square[1]] == color + "N" and square not in removed:
+            return square, exchangeValues["N"]
+    best = None
+    best_value = exchangeValues["K"]
+    rays = raySquares[row][col]
+    for j in range(8):
+        slider = "R" if j < 4 else "B"
+        for square in rays[j]:
+            piece = board[square[0]][square[1]]
+            if piece != "--" and square not in removed:
+                if piece[0] == color and (piece[1] == slider or piece[1] == "Q") and \
+                        exchangeValues[piece[1]] < best_value:
+                    best = square
+                    best_value = exchangeValues[piece[1]]
+                break
+    if best is not None:
+        return best, best_value
+    for square in kingSquares[row][col]:
+        if board[square[0]][square[1]] == color + "K" and square not in removed:
+            return square, exchangeValues["K"]
+    return None
+
+
+def staticExchange(gameState, move):
+    """
+    Material won or lost by the capture sequence move starts on its landing square, with both sides
+    recapturing with their least valuable attacker and free to stop whenever carrying on would lose. Pins are ignored.
+    """
+    board = gameState.board
+    start_row, start_col = divmod(move & 63, 8)
+    end_row, end_col = divmod(move >> 6 & 63, 8)
+    color = board[start_row][start_col][0]
+    gain = [exchangeValues[pieceNames[move >> 20 & 15][1]] if move >> 20 else 0]
+    on_square = exchangeValues[board[start_row][start_col][1]]  # value of the piece standing on the square
+    if move & MOVE_KIND == MOVE_PROMOTION:
+        promoted = exchangeValues[Move.promotion_pieces[move >> 14 & 3]]
+        gain[0] += promoted - exchangeValues["p"]
+        on_square = promoted
+    removed = {(start_row, start_col)}
+    if move & MOVE_KIND == MOVE_ENPASSANT:
+        removed.add((start_row, end_col))
+    while True:
+        color = "b" if color == "w" else "w"
+        attacker = leastValuableAttacker(board, end_row, end_col, color, removed)
+        if attacker is None:
+            break
+        gain.append(on_square - gain[-1])  # score for the side recapturing if the sequence stopped here
+        if max(-gain[-2], gain[-1]) < 0:
+            gain.pop()  # neither side wants to carry on, so this capture is never made
+            break
+        removed.add(attacker[0])
+        on_square = attacker[1]
+    for i in range(len(gain) - 1, 0, -1):
+        gain[i - 1] = -max(-gain[i - 1], gain[i])
+    return gain[0]
+
+
+def scoreToTable(score, ply):
+    """
+    Mate scores are stored as the distance to mate from the position itself, not from the root.
+    """
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class SearchTimeout(Exception):
+    """
+    Raised from inside the search when the time or node budget runs out.
+    """
+
+
+class SearchResult:
+    """
+    Outcome of a search: the best packed move, its score and how much work the search did.
+    """
+
+    def __init__(self, bestMove, score, depth, nodes, elapsed, qnodes=0):
+        self.bestMove = bestMove
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes  # main search
+        self.qnodes = qnodes  # quiescence search
+        self.elapsed = elapsed
+
+    @property
+    def nps(self):
+        return (self.nodes + self.qnodes) / self.elapsed if self.elapsed else 0
+
+    def __str__(self):
+        best = Move.fromCode(self.bestMove).getUciNotation() if self.bestMove is not None else "none"
+        return "depth %d score %d nodes %d qnodes %d time %.2fs nps %.0f best %s" % (
+            self.depth, self.score, self.nodes, self.qnodes, self.elapsed, self.nps, best)
+
+
+class Search:
+    """
+    Iterative deepening negamax search with alpha-beta pruning.
+    Each depth is searched in full before the next one starts, so when the time or node budget runs out
+    the result of the deepest completed depth is returned and the game state is left as it was found.
+    Results are kept in a transposition table, which may be shared between searches of the same game.
+    With ordering, moves are searched best guess first: the table move, captures by MVV-LVA, two killer moves
+    per ply and then quiet moves by their history score.
+    With bitbases, positions they cover are scored from the tables instead of being searched further. When the root
+    itself is covered the tables cannot tell how to make progress, so only moves that keep its result are searched
+    and the search goes on as usual below them.
+    """
+
+    checkInterval = 256  # nodes between looks at the clock and the stop flag
+
+    def __init__(self, gameState, maxDepth=64, timeLimit=None, nodeLimit=None, table=None, ordering=True,
+                 stopEvent=None, rootMoves=None, bitbases=None):
+        self.gameState = gameState
+        self.bitbases = bitbases
+        self.probing = False  # probe the bitbases inside the tree, off when the root is covered by them
+        self.rootMoves = rootMoves  # search only these moves at the root, all legal moves when None
+        self.stopEvent = stopEvent  # threading.Event another thread can set to stop the search
+        self.table = table if table is not None else TranspositionTable()
+        self.ordering = ordering
+        self.killers = [[0, 0] for ply in range(MAX_PLY)]  # quiet moves that caused a cutoff at each ply
+        self.history = [0] * 4096  # indexed by the low 12 bits of a move, its start and end square
+        self.maxDepth = maxDepth
+        self.timeLimit = timeLimit  # seconds
+        self.nodeLimit = nodeLimit
+        self.nodes = 0
+        self.qnodes = 0
+        self.deadline = None
+        self.nextCheck = 0
+        self.iterations = []  # SearchResult of every completed depth of the last search
+
+    def search(self, out=None, report=None):
+        """
+        Search the current position and return a SearchResult, writing a line per completed depth to out if given
+        and passing the SearchResult of every completed depth to report.
+        """
+        gameState = self.gameState
+        start = time.perf_counter()
+        self.nodes = 0
+        self.qnodes = 0
+        self.deadline = start + self.timeLimit if self.timeLimit is not None else None
+        self.nextCheck = self.checkInterval if self.nodeLimit is None else min(self.checkInterval, self.nodeLimit)
+        self.table.newSearch()
+        self.killers = [[0, 0] for ply in range(MAX_PLY)]
+        self.history = [0] * 4096
+
+        self.iterations = []
+        root_moves = gameState.getValidMoves()
+        if self.rootMoves is not None:
+            root_moves = [move for move in root_moves if move in self.rootMoves]
+        self.probing = self.bitbases is not None
+        if self.probing:
+            root_result = self.bitbases.probe(gameState)
+            if root_result is not None:
+                root_moves = [move for move in root_moves if self.bitbaseResultAfter(move) == -root_result] or root_moves
+                self.probing = False
+        if len(root_moves) == 0:
+            return SearchResult(None, -MATE_SCORE if gameState.inCheck else 0, 0, 0, 0.0)
+        if self.ordering:
+            self.orderMoves(root_moves, 0, 0)
+        result = SearchResult(root_moves[0], 0, 0, 0, 0.0)
+        log_length = len(gameState.moveLog)
+        for depth in range(1, self.maxDepth + 1):
+            # the best move so far is searched first, so a depth cut short can still improve on it
+            root_moves.remove(result.bestMove)
+            root_moves.insert(0, result.bestMove)
+            alpha = -INFINITY
+            best_move = None
+            try:
+                for move in root_moves:
+                    gameState.makeMove(move)
+                    score = -self.negamax(depth - 1, -INFINITY, -alpha, 1)
+                    gameState.undoMove()
+                    if score > alpha:
+                        alpha = score
+                        best_move = move
+            except SearchTimeout:
+                while len(gameState.moveLog) > log_length:
+                    gameState.undoMove()
+                if best_move is not None:  # moves searched at this depth so far beat the previous best
+                    result.bestMove = best_move
+                    result.score = alpha
+                break
+            self.table.store(gameState.zobristKey, best_move, scoreToTable(alpha, 0), depth, EXACT)
+            result = SearchResult(best_move, alpha, depth, self.nodes, time.perf_counter() - start, self.qnodes)
+            self.iterations.append(result)
+            if out is not None:
+                out.write("%s\n" % result)
+            if report is not None:
+                report(result)
+            if abs(alpha) >= MATE_SCORE - depth:  # a forced mate within depth plies, searching deeper will not change it
+                break
+        result.nodes = self.nodes
+        result.qnodes = self.qnodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def negamax(self, depth, alpha, beta, ply):
+        """
+        Score of the current position searched depth plies deep, fail-soft inside the window alpha beta.
+        """
+        self.nodes += 1
+        if self.nodes + self.qnodes >= self.nextCheck:
+            self.checkBudget()
+        gameState = self.gameState
+        if self.probing:
+            result = self.bitbases.probe(gameState)
+            if result is not None:
+                return self.bitbaseScore(result, ply)
+        if depth == 0:
+            return self.quiesce(alpha, beta, ply)
+        key = gameState.zobristKey
+        entry = self.table.probe(key)
+        tt_move = 0
+        if entry is not None:
+            tt_move = entry[0]
+            if entry[2] >= depth:  # searched at least as deep before, the bound may settle it
+                score = scoreFromTable(entry[1], ply)
+                bound = entry[3]
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+        moves = gameState.getValidMoves()
+        if len(moves) == 0:
+            return -MATE_SCORE + ply if gameState.inCheck else 0  # prefer the quickest mate
+        if self.ordering:
+            self.orderMoves(moves, tt_move, ply)
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = None
+        for move in moves:
+            gameState.makeMove(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            gameState.undoMove()
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not move >> 20 and move & MOVE_KIND != MOVE_PROMOTION:  # quiet move
+                            self.updateQuietCutoff(move, depth, ply)
+                        break  # the opponent will not allow this line
+        if best >= beta:
+            bound = LOWER
+        elif best <= original_alpha:
+            bound = UPPER
+        else:
+            bound = EXACT
+        self.table.store(key, best_move, scoreToTable(best, ply), depth, bound)
+        return best
+
+    def quiesce(self, alpha, beta, ply):
+        """
+        Search captures and promotions only until the position is quiet, so the static evaluation is never taken
+        in the middle of an exchange. Captures that lose material by static exchange are not searched.
+        In check there is no standing pat, every evasion is searched so a mate at the horizon is seen.
+        """
+        self.qnodes += 1
+        if self.nodes + self.qnodes >= self.nextCheck:
+            self.checkBudget()
+        gameState = self.gameState
+        if self.probing:
+            result = self.bitbases.probe(gameState)
+            if result is not None:
+                return result * KNOWN_WIN + self.evaluate()
+        moves = gameState.iterValidMoves()
+        move = next(moves, None)  # generating the first move finds out whether the side to move is in check
+        if gameState.inCheck:
+            if move is None:
+                return -MATE_SCORE + ply
+            evasions = [move]
+            evasions.extend(moves)
+            evasions.sort(key=lambda move: mvvLva[move >> 16 & 15][move >> 20 & 15], reverse=True)
+            best = -INFINITY
+            for move in evasions:
+                gameState.makeMove(move)
+                score = -self.quiesce(-beta, -alpha, ply + 1)
+                gameState.undoMove()
+                if score > best:
+                    best = score
+                    if score > alpha:
+                        alpha = score
+                        if alpha >= beta:
+                            break
+            return best
+
+        stand_pat = self.evaluate()  # the side to move can usually decline every capture
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        best = stand_pat
+
+        captures = []
+        while move is not None and (move >> 20 or move & MOVE_KIND == MOVE_PROMOTION):
+            captures.append(move)  # captures and promotions come first, stop at the first quiet move
+            move = next(moves, None)
+        captures.sort(key=lambda move: mvvLva[move >> 16 & 15][move >> 20 & 15], reverse=True)
+
+        for move in captures:
+            gain = exchangeValues[pieceNames[move >> 20 & 15][1]] if move >> 20 else 0
+            if move & MOVE_KIND == MOVE_PROMOTION:
+                gain += exchangeValues[Move.promotion_pieces[move >> 14 & 3]] - exchangeValues["p"]
+            if stand_pat + gain + DELTA_MARGIN <= alpha:
+                continue  # delta pruning, this capture cannot bring the score up to alpha
+            if staticExchange(gameState, move) < 0:
+                continue  # loses material
+            gameState.makeMove(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            gameState.undoMove()
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def orderMoves(self, moves, tt_move, ply):
+        """
+        Sort moves in place so the ones most likely to cause a cutoff are searched first.
+        """
+        killers = self.killers[ply]
+        history = self.history
+
+        def moveScore(move):
+            if move == tt_move:
+                return TT_MOVE_SCORE
+            if move >> 20 or move & MOVE_KIND == MOVE_PROMOTION:
+                # promotions score as capturing the promoted piece
+                captured = move >> 20 & 15 if move & MOVE_KIND != MOVE_PROMOTION else 5 - (move >> 14 & 3)
+                return CAPTURE_SCORE + mvvLva[move >> 16 & 15][captured]
+            if move == killers[0]:
+                return KILLER_SCORE
+            if move == killers[1]:
+                return KILLER_SCORE - 1
+            return history[move & 4095]
+
+        moves.sort(key=moveScore, reverse=True)
+
+    def updateQuietCutoff(self, move, depth, ply):
+        """
+        Remember a quiet move that refuted the position as a killer for its ply and in the history table.
+        """
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move & 4095] += depth * depth
+
+    def checkBudget(self):
+        """
+        Raise SearchTimeout once the node or time budget has run out or the search has been stopped.
+        """
+        nodes = self.nodes + self.qnodes
+        if self.nodeLimit is not None and nodes >= self.nodeLimit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.stopEvent is not None and self.stopEvent.is_set():
+            raise SearchTimeout()
+        self.nextCheck = nodes + self.checkInterval
+        if self.nodeLimit is not None:
+            self.nextCheck = min(self.nextCheck, self.nodeLimit)
+
+    def bitbaseResultAfter(self, move):
+        """
+        Bitbase result for the opponent after a move from a position the bitbases cover. Moves that leave
+        no table, a capture of the piece or an under-promotion to a minor piece, leave a draw.
+        """
+        self.gameState.makeMove(move)
+        result = self.bitbases.probe(self.gameState)
+        self.gameState.undoMove()
+        return result if result is not None else 0
+
+    def bitbaseScore(self, result, ply):
+        """
+        Score of a position the bitbases have a result for: a draw is 0 and a win or loss is KNOWN_WIN plus the
+        evaluation, which rewards pushing the lone king to the edge and the pawn up the board. Checkmate still scores
+        as mate, so the search plays it when it sees it.
+        """
+        if result == 0:
+            return 0
+        if result < 0 and len(self.gameState.getValidMoves()) == 0:
+            return -MATE_SCORE + ply
+        return result * KNOWN_WIN + self.evaluate()
+
+    def evaluate(self):
+        """
+        Static evaluation of the current position, kept up to date by GameState itself.
+        """
+        return self.gameState.evaluate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a position and print the best move.")
+    parser.add_argument("--fen", help="position to search, the starting position by default")
+    parser.add_argument("--depth", type=int, help="deepest iteration to search")
+    parser.add_argument("--time", type=float, help="time budget in seconds")
+    parser.add_argument("--nodes", type=int, help="node budget")
+    parser.add_argument("--hash", type=int, default=16, metavar="MB", help="transposition table size")
+    parser.add_argument("--no-ordering", action="store_true",
+                        help="search moves in generation order, to measure what move ordering saves")
+    parser.add_argument("--bitbases", metavar="DIR", help="directory of endgame bitbases made with Bitbases.py")
+    parser.add_argument("--check-see", action="store_true", help="check staticExchange against exchangePositions")
+    args = parser.parse_args()
+
+    if args.check_see:
+        passed = True
+        for fen, notation, expected in exchangePositions:
+            gameState = GameState.fromFen(fen)
+            move = next(move for move in gameState.getValidMoves() if Move.fromCode(move).getUciNotation() == notation)
+            score = staticExchange(gameState, move)
+            passed = passed and score == expected
+            print("%-60s %s %5d  %s" % (fen, notation, score, "ok" if score == expected else "FAIL (expected %d)" % expected))
+        if not passed:
+            sys.exit(1)
+        return
+
+    if args.depth is None and args.time is None and args.nodes is None:
+        args.time = 5.0  # some budget is needed, otherwise the search would never stop
+    gameState = GameState.fromFen(args.fen) if args.fen else GameState()
+    table = TranspositionTable(args.hash)
+    bitbases = Bitbases(args.bitbases) if args.bitbases else None
+    result = Search(gameState, args.depth or 64, args.time, args.nodes, table, not args.no_ordering,
+                    bitbases=bitbases).search(sys.stdout)
+    print(table)
+    print("bestmove %s" % (Move.fromCode(result.bestMove).getUciNotation() if result.bestMove is not None else "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+
+from Bitbases import Bitbases
+from ChessGame import GameState
+from OpeningBook import OpeningBook
+from Search import Search, SearchResult
+from TranspositionTable import TranspositionTable
+
+
+class SearchWorker:
+    """
+    Runs searches on a background thread so the pygame loop keeps drawing and handling input while the engine thinks.
+    Positions are handed over as the packed move log of a game from the starting position, and results come back
+    through a queue tagged with the id startSearch returned, so a result for a position that is gone can be ignored.
+    Every search can be cancelled, and all of them share one transposition table: pondering on the opponent's
+    expected reply leaves the table warm for the real search that follows.
+    With an opening book, positions in the book are answered from it without searching,
+    and endgame bitbases in bitbasePath are used by every search.
+    """
+
+    def __init__(self, timeLimit=2.0, tableSizeMB=16, bookPath=None, bitbasePath=None):
+        self.timeLimit = timeLimit  # seconds per move, pondering runs until it is cancelled
+        self.table = TranspositionTable(tableSizeMB)
+        self.book = OpeningBook(bookPath) if bookPath and os.path.exists(bookPath) else None
+        self.bitbases = Bitbases(bitbasePath) if bitbasePath and os.path.isdir(bitbasePath) else None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.searchId = 0
+        self.stopEvent = threading.Event()  # stop flag of the most recent request
+        self.thread = threading.Thread(target=self.run, name="search worker", daemon=True)
+        self.thread.start()
+
+    def startSearch(self, moveLog, ponder=False):
+        """
+        Cancel whatever is running and search the position after moveLog, returns the id of the search.
+        With ponder the search is for the position after the opponent's expected reply and reports no result.
+        """
+        self.cancel()
+        self.searchId += 1
+        self.stopEvent = threading.Event()
+        self.requests.put((self.searchId, list(moveLog), ponder, self.stopEvent))
+        return self.searchId
+
+    def cancel(self):
+        self.stopEvent.set()
+
+    def getResult(self, searchId):
+        """
+        The SearchResult of the given search if it has finished, without waiting. Results of older searches are dropped.
+        """
+        while True:
+            try:
+                result_id, result = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if result_id == searchId:
+                return result
+
+    def close(self):
+        self.cancel()
+        self.requests.put(None)
+        if self.book is not None or self.bitbases is not None:
+            self.thread.join()  # the files are mapped until the thread is done with them
+            if self.book is not None:
+                self.book.close()
+            if self.bitbases is not None:
+                self.bitbases.close()
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            search_id, move_log, ponder, stop_event = request
+            if stop_event.is_set():
+                continue  # cancelled before it started
+            gameState = GameState()
+            for move in move_log:
+                gameState.makeMove(move)
+            if ponder:
+                # the best reply found by the last search is still in the table
+                entry = self.table.probe(gameState.zobristKey)
+                if entry is None or entry[0] not in gameState.getValidMoves():
+                    continue
+                gameState.makeMove(entry[0])
+            book_move = self.book.chooseMove(gameState) if self.book is not None else None
+            if book_move is not None:
+                if not ponder:  # nothing to ponder on when the reply will come from the book
+                    self.results.put((search_id, SearchResult(book_move, 0, 0, 0, 0.0)))
+                continue
+            search = Search(gameState, timeLimit=None if ponder else self.timeLimit, table=self.table,
+                            stopEvent=stop_event, bitbases=self.bitbases)
+            result = search.search()
+            if not ponder and not stop_event.is_set():
+                self.results.put((search_id, result))
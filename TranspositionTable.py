@@ -0,0 +1,88 @@
+from array import array
+
+# fixed-size transposition table for the search, keyed by GameState.zobristKey
+# the table is two preallocated arrays of unsigned 64-bit integers: the full key of each slot and its packed entry
+# bits 0-23: best packed move, 24-47: score + scoreOffset, 48-55: depth, 56-57: bound, 58-63: search generation
+# a slot whose entry is 0 is empty, bounds start at 1 so a stored entry is never 0
+
+EXACT, LOWER, UPPER = 1, 2, 3  # score is exact, at least the score (fail high) or at most the score (fail low)
+scoreOffset = 1 << 23
+entryBytes = 16  # one key and one entry per slot
+
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+
+
+class TranspositionTable:
+    """
+    Hash table of search results that keeps a fixed memory footprint of sizeMB megabytes.
+    With the depth-preferred policy a slot keeps the deeper of two results unless its entry is from an older search,
+    with always-replace the newest result wins.
+    """
+
+    def __init__(self, sizeMB=16, policy=DEPTH_PREFERRED):
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise ValueError("unknown replacement policy %r" % policy)
+        self.size = max(1, sizeMB * 1024 * 1024 // entryBytes)
+        self.policy = policy
+        self.keys = array("Q", [0]) * self.size
+        self.entries = array("Q", [0]) * self.size
+        self.generation = 0
+        self.filled = 0
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0  # probes that found the slot holding a different position
+        self.stores = 0
+
+    def newSearch(self):
+        """
+        Start a new search: entries from earlier searches may now be replaced by shallower ones.
+        """
+        self.generation = (self.generation + 1) & 63
+
+    def clear(self):
+        self.keys = array("Q", [0]) * self.size
+        self.entries = array("Q", [0]) * self.size
+        self.generation = 0
+        self.filled = 0
+        self.probes = self.hits = self.collisions = self.stores = 0
+
+    def probe(self, key):
+        """
+        Look up a position, returns (move, score, depth, bound) or None.
+        """
+        self.probes += 1
+        index = key % self.size
+        entry = self.entries[index]
+        if entry == 0:
+            return None
+        if self.keys[index] != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return entry & 0xFFFFFF, (entry >> 24 & 0xFFFFFF) - scoreOffset, entry >> 48 & 255, entry >> 56 & 3
+
+    def store(self, key, move, score, depth, bound):
+        """
+        Save a search result for a position, subject to the replacement policy.
+        """
+        index = key % self.size
+        entry = self.entries[index]
+        if entry == 0:
+            self.filled += 1
+        elif self.policy == DEPTH_PREFERRED and self.keys[index] != key and entry >> 58 == self.generation and \
+                entry >> 48 & 255 > depth:
+            return  # keep the deeper result of this search
+        self.stores += 1
+        self.keys[index] = key
+        self.entries[index] = (move or 0) | (score + scoreOffset) << 24 | depth << 48 | bound << 56 | \
+            self.generation << 58
+
+    @property
+    def fillRate(self):
+        return self.filled / self.size
+
+    def __str__(self):
+        return "transposition table: %d entries (%d MB), %.1f%% full, %d probes, %d hits, %d collisions, %d stores" % (
+            self.size, self.size * entryBytes // (1024 * 1024), 100 * self.fillRate, self.probes, self.hits,
+            self.collisions, self.stores)
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from Bitbases import Bitbases
+from ChessGame import GameState, MOVE_KIND, MOVE_PROMOTION, Move
+from OpeningBook import OpeningBook
+from Search import MATE_BOUND, MATE_SCORE, Search
+from TranspositionTable import TranspositionTable
+
+# headless front end speaking the UCI protocol on stdin and stdout, for GUIs, match runners and analysis tools
+# commands are read on the asyncio loop while searches run on a worker thread, so stop and isready are answered
+# in the middle of a search. run it with python Uci.py
+
+engineName = "chessAI"
+engineAuthor = "chessAI authors"
+moveOverhead = 0.05  # seconds kept back from every move for the time it takes the answer to reach the GUI
+
+
+def parseUciMove(gameState, text):
+    """
+    The packed legal move of the current position written in long algebraic notation (e2e4, e7e8q), or None.
+    """
+    if len(text) not in (4, 5) or text[0] not in Move.files_to_cols or text[1] not in Move.ranks_to_rows or \
+            text[2] not in Move.files_to_cols or text[3] not in Move.ranks_to_rows:
+        return None
+    start_sq = Move.ranks_to_rows[text[1]] * 8 + Move.files_to_cols[text[0]]
+    end_sq = Move.ranks_to_rows[text[3]] * 8 + Move.files_to_cols[text[2]]
+    promotion = text[4].upper() if len(text) == 5 else None
+    for move in gameState.getValidMoves():
+        if move & 63 != start_sq or move >> 6 & 63 != end_sq:
+            continue
+        if move & MOVE_KIND == MOVE_PROMOTION:
+            if promotion != Move.promotion_pieces[move >> 14 & 3]:
+                continue
+        elif promotion is not None:
+            continue
+        return move
+    return None
+
+
+def formatScore(score):
+    """
+    A score the way UCI reports it: centipawns, or moves to mate when a mate has been found.
+    """
+    if score > MATE_BOUND:
+        return "mate %d" % ((MATE_SCORE - score + 1) // 2)
+    if score < -MATE_BOUND:
+        return "mate -%d" % ((MATE_SCORE + score) // 2)
+    return "cp %d" % score
+
+
+class UciEngine:
+    """
+    Reads UCI commands from stdin and writes the answers to out. Only one search runs at a time, it runs on its
+    own thread and reports its best move when it finishes or is stopped. Infinite and ponder searches hold their
+    best move back until stop, or until ponderhit for a ponder search.
+    """
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.outLock = threading.Lock()  # info lines come from the search thread
+        self.gameState = GameState()
+        self.positionValid = True  # False after a position command that could not be read, go is refused until the next
+        self.tableSizeMB = 16
+        self.table = TranspositionTable(self.tableSizeMB)
+        self.bookPath = "book.bin"
+        self.bitbasePath = "bitbases"
+        self.book = None
+        self.bitbases = None
+        self.stopEvent = threading.Event()
+        self.releaseEvent = threading.Event()  # lets a held search send its best move
+        self.searchTask = None
+        self.currentSearch = None
+        self.ponderTimeLimit = None  # time the running ponder search gets once ponderhit arrives
+        self.ponderInfinite = False  # the ponder search carries on until stop even after ponderhit
+
+    def send(self, line):
+        with self.outLock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.openFiles()
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:  # the GUI went away
+                break
+            tokens = line.split()
+            if tokens and not await self.handle(tokens):
+                break
+        await self.stopSearch()
+        self.closeFiles()
+
+    async def handle(self, tokens):
+        """
+        Carry out one command, returns False on quit. Unknown commands are ignored as the protocol asks.
+        """
+        command = tokens[0]
+        if command == "uci":
+            self.send("id name %s" % engineName)
+            self.send("id author %s" % engineAuthor)
+            self.send("option name Hash type spin default 16 min 1 max 1024")
+            self.send("option name Ponder type check default false")
+            self.send("option name BookFile type string default %s" % self.bookPath)
+            self.send("option name BitbasePath type string default %s" % self.bitbasePath)
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            await self.stopSearch()
+            self.setOption(tokens)
+        elif command == "ucinewgame":
+            await self.stopSearch()
+            self.table.clear()
+            self.gameState = GameState()
+        elif command == "position":
+            await self.stopSearch()
+            self.setPosition(tokens)
+        elif command == "go":
+            await self.stopSearch()
+            self.startSearch(tokens)
+        elif command == "stop":
+            await self.stopSearch()
+        elif command == "ponderhit":
+            self.ponderHit()
+        elif command == "quit":
+            return False
+        return True
+
+    def setOption(self, tokens):
+        # setoption name <name> value <value>, names may contain spaces
+        if "name" not in tokens:
+            return
+        name_end = tokens.index("value") if "value" in tokens else len(tokens)
+        name = " ".join(tokens[tokens.index("name") + 1:name_end]).lower()
+        value = " ".join(tokens[name_end + 1:])
+        if name == "hash" and value.isdigit():
+            self.tableSizeMB = max(1, int(value))
+            self.table = TranspositionTable(self.tableSizeMB)
+        elif name == "bookfile":
+            self.bookPath = value
+            self.openFiles()
+        elif name == "bitbasepath":
+            self.bitbasePath = value
+            self.openFiles()
+
+    def openFiles(self):
+        self.closeFiles()
+        if self.bookPath and os.path.exists(self.bookPath):
+            self.book = OpeningBook(self.bookPath)
+        if self.bitbasePath and os.path.isdir(self.bitbasePath):
+            self.bitbases = Bitbases(self.bitbasePath)
+
+    def closeFiles(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.bitbases is not None:
+            self.bitbases.close()
+            self.bitbases = None
+
+    def setPosition(self, tokens):
+        # position startpos | fen <six fields> [moves <move> ...]
+        moves_at = tokens.index("moves") if "moves" in tokens else len(tokens)
+        self.positionValid = False  # until the whole command has been read
+        if len(tokens) > 1 and tokens[1] == "fen":
+            try:
+                self.gameState = GameState.fromFen(" ".join(tokens[2:moves_at]))
+            except ValueError as error:
+                self.send("info string %s" % error)
+                return
+        else:
+            self.gameState = GameState()
+        for text in tokens[moves_at + 1:]:
+            move = parseUciMove(self.gameState, text)
+            if move is None:
+                self.send("info string illegal move %s" % text)
+                return
+            self.gameState.makeMove(move)
+        self.positionValid = True
+
+    def startSearch(self, tokens):
+        # go [depth N] [nodes N] [movetime MS] [wtime MS btime MS winc MS binc MS movestogo N] [infinite]
+        options = {}
+        for i, token in enumerate(tokens[1:-1], 1):
+            if tokens[i + 1].lstrip("-").isdigit():
+                options[token] = int(tokens[i + 1])
+        infinite = "infinite" in tokens
+        ponder = "ponder" in tokens  # searching the opponent's expected move, the clock starts at ponderhit
+        time_limit = None
+        if "movetime" in options:
+            time_limit = options["movetime"] / 1000
+        elif not infinite and ("wtime" in options or "btime" in options):
+            remaining = options.get("wtime" if self.gameState.whiteToMove else "btime", 0) / 1000
+            increment = options.get("winc" if self.gameState.whiteToMove else "binc", 0) / 1000
+            moves_to_go = options.get("movestogo", 30)
+            time_limit = min(remaining / max(1, moves_to_go) + increment * 3 / 4, remaining / 2)
+        if time_limit is not None:
+            time_limit = max(0.01, time_limit - moveOverhead)
+        if time_limit is None and not infinite and "depth" not in options and "nodes" not in options:
+            infinite = True  # a bare go searches until stop
+        if not self.positionValid:
+            self.send("info string no valid position to search")
+            self.send("bestmove 0000")
+            return
+        self.stopEvent = threading.Event()
+        self.releaseEvent = threading.Event()
+        self.ponderTimeLimit = time_limit if ponder else None
+        self.ponderInfinite = infinite
+        # made here rather than on the search thread, so a ponderhit right after go finds it
+        self.currentSearch = Search(self.gameState, options.get("depth", 64), None if ponder else time_limit,
+                                    options.get("nodes"), self.table, stopEvent=self.stopEvent, bitbases=self.bitbases)
+        loop = asyncio.get_running_loop()
+        self.searchTask = loop.run_in_executor(None, self.search, self.currentSearch, infinite,
+                                               infinite or ponder, self.releaseEvent)
+
+    def search(self, search, infinite, hold, releaseEvent):
+        """
+        Run on the search thread: search the current position and send the best move, once releaseEvent is set
+        when hold is.
+        """
+        best_move = self.book.chooseMove(self.gameState) if self.book is not None and not infinite else None
+        if best_move is None:
+            result = search.search(report=self.sendInfo)
+            best_move = result.bestMove
+        if hold:
+            releaseEvent.wait()  # the best move is only reported once the GUI says stop, or ponderhit
+        self.send("bestmove %s" % (Move.fromCode(best_move).getUciNotation() if best_move is not None else "0000"))
+
+    def ponderHit(self):
+        """
+        The opponent played the move the running ponder search assumed: carry on under the time control of the go
+        command from now on, and report the best move when the search finishes.
+        """
+        search = self.currentSearch
+        if self.searchTask is None or search is None or self.releaseEvent.is_set():
+            return
+        if self.ponderTimeLimit is not None:
+            search.timeLimit = self.ponderTimeLimit  # read when the search has not started yet
+            search.deadline = time.perf_counter() + self.ponderTimeLimit
+            search.nextCheck = 0  # look at the clock at the next node
+        if not self.ponderInfinite:
+            self.releaseEvent.set()
+
+    def sendInfo(self, result):
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" % (
+            result.depth, formatScore(result.score), result.nodes + result.qnodes, result.nps,
+            result.elapsed * 1000, Move.fromCode(result.bestMove).getUciNotation()))
+
+    async def stopSearch(self):
+        """
+        Stop the running search, if any, and wait until it has sent its best move.
+        """
+        if self.searchTask is not None:
+            self.stopEvent.set()
+            self.releaseEvent.set()
+            await self.searchTask
+            self.searchTask = None
+            self.currentSearch = None
+
+
+def main():
+    asyncio.run(UciEngine().run())
+
+
+if __name__ == "__main__":
+    main()